@@ -0,0 +1,85 @@
+import argparse
+import os
+import random
+import shutil
+from datetime import datetime, timedelta
+from PIL import Image
+
+EXIF_IFD_POINTER = 0x8769
+GPS_IFD_POINTER = 0x8825
+DATE_TIME_ORIGINAL = 0x9003
+
+
+def _dms(value):
+    value = abs(value)
+    degrees = int(value)
+    minutes = int((value - degrees) * 60)
+    return (float(degrees), float(minutes), round((value - degrees - minutes / 60) * 3600, 2))
+
+
+def synthetic_image(width, height, rng, noise):
+    # A colour gradient with sensor-like noise compresses roughly like a real photo, unlike flat
+    # colour (too small) or pure noise (too large). Noise is cut from one shared larger field.
+    base = Image.linear_gradient("L").resize((width, height))
+    channels = []
+    for _ in range(3):
+        x, y = rng.randrange(noise.width - width + 1), rng.randrange(noise.height - height + 1)
+        gradient = base.transpose(rng.choice((Image.Transpose.FLIP_LEFT_RIGHT, Image.Transpose.FLIP_TOP_BOTTOM,
+                                              Image.Transpose.ROTATE_180)))
+        channels.append(Image.blend(gradient, noise.crop((x, y, x + width, y + height)), rng.uniform(0.3, 0.6)))
+    return Image.merge("RGB", channels)
+
+
+def synthetic_exif(taken, latitude, longitude):
+    exif = Image.Exif()
+    exif.get_ifd(EXIF_IFD_POINTER)[DATE_TIME_ORIGINAL] = taken.strftime("%Y:%m:%d %H:%M:%S")
+    exif.get_ifd(GPS_IFD_POINTER).update({
+        1: "N" if latitude >= 0 else "S", 2: _dms(latitude),
+        3: "E" if longitude >= 0 else "W", 4: _dms(longitude),
+        5: b"\x00", 6: 120.0
+    })
+    return exif
+
+
+def generate_corpus(directory, count=100, width=1600, height=1200, quality=85, duplicates=0.0, seed=0):
+    # Writes count JPEG files, of which the given share are byte-identical copies of earlier
+    # ones, with EXIF capture time and GPS positions in small clusters like field trips.
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    start = datetime(2024, 5, 1, 9, 0, 0)
+    latitude, longitude = 41.0, 29.0
+    noise = Image.effect_noise((width + 256, height + 256), 40)
+    paths = []
+    for index in range(count):
+        path = os.path.join(directory, f"IMG_{index:05d}.jpg")
+        if paths and rng.random() < duplicates:
+            shutil.copyfile(rng.choice(paths), path)
+        else:
+            if index % 5 == 0:
+                latitude += rng.uniform(-0.01, 0.01)
+                longitude += rng.uniform(-0.01, 0.01)
+            taken = start + timedelta(seconds=index * 30)
+            synthetic_image(width, height, rng, noise).save(path, "JPEG", quality=quality,
+                                                     exif=synthetic_exif(taken, latitude, longitude))
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic image corpus for benchmarks.")
+    parser.add_argument("directory")
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--width", type=int, default=1600)
+    parser.add_argument("--height", type=int, default=1200)
+    parser.add_argument("--quality", type=int, default=85)
+    parser.add_argument("--duplicates", type=float, default=0.0, help="share of files that are exact copies")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    paths = generate_corpus(args.directory, args.count, args.width, args.height, args.quality, args.duplicates,
+                            args.seed)
+    size = sum(os.path.getsize(path) for path in paths)
+    print(f"Wrote {len(paths)} images ({size / 1e6:.1f} MB) to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
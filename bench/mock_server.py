@@ -0,0 +1,220 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+SPECIES = [
+    ("Quercus robur", "Quercus", "Fagaceae", ["English oak", "Saplı meşe"]),
+    ("Pinus nigra", "Pinus", "Pinaceae", ["Black pine", "Karaçam"]),
+    ("Acer campestre", "Acer", "Sapindaceae", ["Field maple"]),
+    ("Abies alba", "Abies", "Pinaceae", ["Silver fir"]),
+    ("Fagus sylvatica", "Fagus", "Fagaceae", ["European beech", "Kayın"]),
+]
+ORGANS = ["leaf", "flower", "fruit", "bark"]
+
+
+class MockState:
+    # Behaviour and counters of the mock API, shared by all handler threads.
+    def __init__(self, latency=0.3, jitter=0.1, error_rate=0.0, throttle_rate=0.0, retry_after=1.0,
+                 daily_quota=None, rejected_keys=(), seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.daily_quota = daily_quota
+        self.rejected_keys = set(rejected_keys)
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.reset()
+
+
+    def reset(self):
+        with self.lock:
+            self.stats = {"requests": 0, "identify": 0, "errors": 0, "throttled": 0, "quota_rejected": 0,
+                          "bytes_received": 0, "images": 0, "used": 0, "unauthorized": 0}
+            self.used = {}
+
+
+    def count(self, **counts):
+        with self.lock:
+            for key, value in counts.items():
+                self.stats[key] += value
+
+
+    def outcome(self, key):
+        # Decides the fate of one identification request: "ok", "error", "throttle", "quota" or
+        # "unauthorized". The daily quota applies to each API key separately.
+        with self.lock:
+            roll = self.random.random()
+            delay = max(0.0, self.random.gauss(self.latency, self.jitter)) if self.jitter else self.latency
+            if key in self.rejected_keys:
+                return "unauthorized", 0.0
+            if self.daily_quota is not None and self.used.get(key, 0) >= self.daily_quota:
+                return "quota", delay
+            if roll < self.error_rate:
+                return "error", delay
+            if roll < self.error_rate + self.throttle_rate:
+                return "throttle", 0.0
+            self.stats["used"] += 1
+            self.used[key] = self.used.get(key, 0) + 1
+            return "ok", delay
+
+
+    def remaining(self, key):
+        with self.lock:
+            return None if self.daily_quota is None else max(0, self.daily_quota - self.used.get(key, 0))
+
+
+def identify_response(images, lang, remaining):
+    results = []
+    for index, (name, genus, family, common) in enumerate(SPECIES):
+        results.append({
+            "score": round(0.9 / (index + 1), 5),
+            "species": {"scientificNameWithoutAuthor": name, "scientificNameAuthorship": "L.",
+                        "genus": {"scientificNameWithoutAuthor": genus},
+                        "family": {"scientificNameWithoutAuthor": family}, "commonNames": common},
+            "gbif": {"id": str(1000 + index)}, "powo": {"id": f"{index}-1"}
+        })
+    response = {
+        "query": {"project": "all", "images": [f"image_{i}" for i in range(images)], "organs": ["auto"] * images},
+        "language": lang,
+        "preferedReferential": "k-world-flora",
+        "bestMatch": results[0]["species"]["scientificNameWithoutAuthor"],
+        "results": results,
+        "predictedOrgans": [{"image": f"image_{i}", "filename": f"image_{i}.jpg", "organ": ORGANS[i % len(ORGANS)],
+                             "score": 0.8} for i in range(images)],
+        "version": "mock",
+    }
+    if remaining is not None:
+        response["remainingIdentificationRequests"] = remaining
+    return response
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, code, data, headers=None):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip(), 16)
+                chunks.append(self.rfile.read(size + 2)[:size])
+                if size == 0:
+                    return b"".join(chunks)
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        path = url.path.rstrip("/").split("/v2/", 1)[-1]
+        if path == "_stats":
+            with self.state.lock:
+                return self.send_json(200, dict(self.state.stats))
+        self.state.count(requests=1)
+        key = query.get("api-key", [""])[0]
+        if key in self.state.rejected_keys:
+            self.state.count(unauthorized=1)
+            return self.send_json(401, {"message": "Invalid API key"})
+        if path == "_status":
+            return self.send_json(200, {"status": "ok"})
+        if path == "languages":
+            return self.send_json(200, ["en", "fr", "tr"])
+        if path == "projects":
+            return self.send_json(200, [{"id": "all", "title": "All"}, {"id": "weurope", "title": "Western Europe"}])
+        if path == "species" or path.endswith("/species"):
+            page = int(query.get("page", ["1"])[0])
+            size = int(query.get("pageSize", ["100"])[0])
+            chunk = SPECIES[(page - 1) * size:page * size]
+            return self.send_json(200, [{"scientificNameWithoutAuthor": name, "gbifId": 1000 + index,
+                                         "commonNames": common} for index, (name, _, _, common) in enumerate(chunk)])
+        if path == "subscription":
+            return self.send_json(200, {"identify": {"quota": self.state.daily_quota}})
+        if path == "quota/daily":
+            return self.send_json(200, {"count": {"identify": self.state.used.get(key, 0)}})
+        self.send_json(404, {"message": "Not found"})
+
+    def do_POST(self):
+        body = self.read_body()
+        received = len(body)
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        path = url.path.rstrip("/").split("/v2/", 1)[-1]
+        if path == "_reset":
+            self.state.reset()
+            return self.send_json(200, {"status": "reset"})
+        if not path.startswith("identify/"):
+            self.state.count(requests=1, bytes_received=received)
+            return self.send_json(404, {"message": "Not found"})
+        outcome, delay = self.state.outcome(query.get("api-key", [""])[0])
+        self.state.count(requests=1, identify=1, bytes_received=received)
+        if outcome == "throttle":
+            self.state.count(throttled=1)
+            return self.send_json(429, {"message": "Too Many Requests"},
+                                  {"Retry-After": str(self.state.retry_after)})
+        time.sleep(delay)
+        if outcome == "unauthorized":
+            self.state.count(unauthorized=1)
+            return self.send_json(401, {"message": "Invalid API key"})
+        if outcome == "quota":
+            self.state.count(quota_rejected=1)
+            return self.send_json(429, {"message": "Daily quota exceeded"})
+        if outcome == "error":
+            self.state.count(errors=1)
+            return self.send_json(503, {"message": "Service Unavailable"})
+        images = body.count(b'name="images"') or 1
+        self.state.count(images=images)
+        self.send_json(200, identify_response(images, query.get("lang", ["en"])[0],
+                                                 self.state.remaining(query.get("api-key", [""])[0])))
+
+
+def start(port=0, **options):
+    handler = type("Handler", (MockHandler,), {"state": MockState(**options)})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v2/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Pl@ntNet v2 API.")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.3, help="mean response time in seconds")
+    parser.add_argument("--jitter", type=float, default=0.1, help="standard deviation of the response time")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--daily-quota", type=int, help="identifications allowed per API key")
+    parser.add_argument("--reject-key", action="append", default=[], help="API key answered with 401")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    server, base_url = start(args.port, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                             throttle_rate=args.throttle_rate, retry_after=args.retry_after,
+                             daily_quota=args.daily_quota, rejected_keys=args.reject_key, seed=args.seed)
+    print(base_url, flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
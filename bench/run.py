@@ -0,0 +1,293 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+
+import requests
+from corpus import generate_corpus
+from endpoints import PlantNetEndpoints
+from scan import scan_images
+from utils import identify_images
+
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "..", "bench_output.txt")
+
+
+class TimedEndpoints(PlantNetEndpoints):
+    # Records the wall time of every endpoint call, including retries and waits inside it.
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timings = {}
+        self.timings_lock = threading.Lock()
+
+
+    def _timed(self, name, func, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self.timings_lock:
+                self.timings.setdefault(name, []).append(elapsed)
+
+
+    def identify_post(self, *args, **kwargs):
+        return self._timed("identify_post", super().identify_post, *args, **kwargs)
+
+
+    def _status(self, *args, **kwargs):
+        return self._timed("_status", super()._status, *args, **kwargs)
+
+
+    def languages(self, *args, **kwargs):
+        return self._timed("languages", super().languages, *args, **kwargs)
+
+
+    def species(self, *args, **kwargs):
+        return self._timed("species", super().species, *args, **kwargs)
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def latency_summary(values):
+    return {"calls": len(values), **{f"p{q}": round(percentile(values, q) * 1000, 1) if values else None
+                                      for q in (50, 95, 99)}}
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+@contextlib.contextmanager
+def mock_server(args):
+    # The mock runs in its own process so its threads do not compete with the client for the GIL
+    # and its memory is not counted against the client.
+    command = [sys.executable, os.path.join(BENCH_DIR, "mock_server.py"), "--latency", str(args.latency),
+               "--jitter", str(args.jitter), "--error-rate", str(args.error_rate),
+               "--throttle-rate", str(args.throttle_rate), "--retry-after", str(args.retry_after),
+               "--seed", str(args.seed)]
+    if args.daily_quota is not None:
+        command += ["--daily-quota", str(args.daily_quota)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    try:
+        yield process.stdout.readline().strip()
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def server_stats(base_url, reset=False):
+    if reset:
+        requests.post(base_url + "_reset").raise_for_status()
+    response = requests.get(base_url + "_stats")
+    response.raise_for_status()
+    return response.json()
+
+
+def bench_identify_post(pne, images, args):
+    # Calls identify_post directly from a thread pool, one image per request.
+    def identify(image):
+        try:
+            pne.identify_post(images=[image])
+            return 0
+        except Exception:
+            return 1
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        errors = sum(executor.map(identify, images))
+    return len(images), errors
+
+
+def bench_metadata(pne, images, args):
+    # Sequential calls of the cheap GET endpoints; measures per-call overhead rather than throughput.
+    errors = 0
+    for _ in range(args.metadata_calls):
+        for call in (pne._status, pne.languages, lambda: pne.species(pageSize=100)):
+            try:
+                call()
+            except Exception:
+                errors += 1
+    return 0, errors
+
+
+def bench_identify_images(pne, images, args):
+    # identify_images is the batch core of identify_images_api without the folder dialog.
+    preprocessor = None
+    if args.max_side:
+        from preprocess import ImagePreprocessor
+        preprocessor = ImagePreprocessor(max_side=args.max_side)
+    from progress import Progress
+    progress = Progress(total=len(images))
+    with tempfile.TemporaryDirectory() as output_dir, contextlib.ExitStack() as stack:
+        if not args.verbose:
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+        identify_images(pne, iter(images), os.path.join(output_dir, "results.csv"), workers=args.workers,
+                        preprocessor=preprocessor, dedup=args.dedup, progress=progress)
+    status = progress.snapshot()
+    return status["done"], status["errors"]
+
+
+SCENARIOS = {"identify_post": bench_identify_post, "identify_images": bench_identify_images,
+             "metadata": bench_metadata}
+
+
+def run_scenario(name, base_url, images, args):
+    pne = TimedEndpoints("benchmark", base_url=base_url, pool_size=max(10, args.workers))
+    server_stats(base_url, reset=True)
+    if args.trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        done, errors = SCENARIOS[name](pne, images, args)
+    finally:
+        elapsed = time.perf_counter() - started
+        traced_peak = tracemalloc.get_traced_memory()[1] if args.trace_memory else None
+        if args.trace_memory:
+            tracemalloc.stop()
+        pne.close()
+    stats = server_stats(base_url)
+    return {
+        "scenario": name,
+        "images": done,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "images_per_second": round(done / elapsed, 2) if done and elapsed > 0 else None,
+        "latency_ms": {method: latency_summary(values) for method, values in pne.timings.items()},
+        "requests": stats["identify"],
+        "bytes_uploaded": stats["bytes_received"],
+        "server_errors": stats["errors"],
+        "throttled": stats["throttled"],
+        "quota_rejected": stats["quota_rejected"],
+        "peak_rss_mb": peak_rss_mb(),
+        "traced_peak_mb": round(traced_peak / (1 << 20), 1) if traced_peak is not None else None,
+    }
+
+
+def run_isolated(name, base_url, corpus, args):
+    # Every scenario runs in a fresh interpreter, so ru_maxrss is the peak of that scenario alone
+    # rather than of the corpus generation and all scenarios run before it in the same process.
+    with tempfile.TemporaryDirectory() as temp:
+        result_file = os.path.join(temp, "result.json")
+        subprocess.run([sys.executable, os.path.abspath(__file__)] + sys.argv[1:] +
+                       ["--scenario", name, "--corpus", corpus, "--base-url", base_url, "--result-file", result_file],
+                       check=True)
+        with open(result_file, encoding="utf-8") as f:
+            return json.load(f)
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def previous_result(output_file, result):
+    # The last recorded run of the same scenario with the same settings, for comparison.
+    if not os.path.exists(output_file):
+        return None
+    previous = None
+    with open(output_file, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get("scenario") == result["scenario"] and entry.get("config") == result["config"]:
+                previous = entry
+    return previous
+
+
+def report(result, previous):
+    print(f"{result['scenario']}: {result['images']} images in {result['seconds']:.2f}s, "
+          f"{result['images_per_second']} images/s, {result['errors']} errors")
+    for method, summary in result["latency_ms"].items():
+        print(f"  {method} latency p50/p95/p99: {summary['p50']}/{summary['p95']}/{summary['p99']} ms "
+              f"({summary['calls']} calls)")
+    print(f"  {result['requests']} requests, {result['bytes_uploaded'] / 1e6:.1f} MB uploaded, "
+          f"{result['server_errors']} server errors, {result['throttled']} throttled, "
+          f"{result['quota_rejected']} over quota")
+    print(f"  peak RSS {result['peak_rss_mb']} MB" +
+          (f", traced peak {result['traced_peak_mb']} MB" if result["traced_peak_mb"] is not None else ""))
+    if previous is not None and previous.get("images_per_second") and result["images_per_second"]:
+        change = result["images_per_second"] / previous["images_per_second"] - 1
+        print(f"  {change:+.1%} images/s compared to {previous.get('revision') or 'previous run'} "
+              f"({previous['images_per_second']} images/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline throughput benchmark against a mock Pl@ntNet API.")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS) + ["all"], default="all")
+    parser.add_argument("--corpus", help="existing image directory (default: generate one in a temp directory)")
+    parser.add_argument("--images", type=int, default=200, help="size of the generated corpus")
+    parser.add_argument("--width", type=int, default=1600)
+    parser.add_argument("--height", type=int, default=1200)
+    parser.add_argument("--duplicates", type=float, default=0.0, help="share of duplicate files in the corpus")
+    parser.add_argument("-w", "--workers", type=int, default=8)
+    parser.add_argument("--max-side", type=int, help="preprocess images before upload (identify_images)")
+    parser.add_argument("--dedup", action="store_true", help="skip duplicate files (identify_images)")
+    parser.add_argument("--metadata-calls", type=int, default=20, help="calls per endpoint (metadata)")
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--daily-quota", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--trace-memory", action="store_true", help="also report the tracemalloc peak (slower)")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT, help="JSON lines file that results are appended to")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    # Set by run_isolated for the child process that runs one scenario.
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.result_file:
+        result = run_scenario(args.scenario, args.base_url, sorted(scan_images(args.corpus, recursive=False)), args)
+        with open(args.result_file, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        return
+    config = {key: value for key, value in vars(args).items()
+              if key not in ("scenario", "corpus", "output", "verbose", "trace_memory", "base_url", "result_file")}
+    scenarios = sorted(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    with contextlib.ExitStack() as stack:
+        corpus = args.corpus
+        if corpus is None:
+            corpus = stack.enter_context(tempfile.TemporaryDirectory())
+            generate_corpus(corpus, args.images, args.width, args.height, duplicates=args.duplicates, seed=args.seed)
+        base_url = stack.enter_context(mock_server(args))
+        for name in scenarios:
+            result = run_isolated(name, base_url, corpus, args)
+            result.update(config=config, revision=git_revision(), python=platform.python_version(),
+                          timestamp=time.strftime("%Y-%m-%dT%H:%M:%S"))
+            report(result, previous_result(args.output, result))
+            with open(args.output, "a", encoding="utf-8") as f:
+                f.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import csv
+from concurrent.futures import ProcessPoolExecutor
+try:
+    from .exif import dms_to_degrees
+except ImportError:
+    from exif import dms_to_degrees
+
+EXTRA_FIELDS = ['Image Count', 'Max Score', 'First Date', 'Last Date', 'Min Latitude', 'Max Latitude',
+                'Min Longitude', 'Max Longitude']
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _location(value):
+    try:
+        lat, lon = value.split(", ")
+        return dms_to_degrees(lat), dms_to_degrees(lon)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _date(value):
+    return value if value and value not in ("N/A", "None") else None
+
+
+def _update(entry, row):
+    entry['organs'].add(row['Predicted Organ'].strip().lower())
+    entry['count'] += 1
+    score = _float(row.get('Species Score'))
+    if score is not None and (entry['max_score'] is None or score > entry['max_score']):
+        entry['max_score'] = score
+    date = _date(row.get('Date'))
+    if date is not None:
+        entry['first_date'] = min(entry['first_date'] or date, date)
+        entry['last_date'] = max(entry['last_date'] or date, date)
+    point = _location(row.get('Location'))
+    if point is not None:
+        box = entry['box']
+        entry['box'] = point * 2 if box is None else (
+            min(box[0], point[0]), min(box[1], point[1]), max(box[2], point[0]), max(box[3], point[1]))
+
+
+def aggregate_file(input_file, file_index=0):
+    # Streams one CSV and returns per-species partial aggregates. 'order' records where a
+    # species was first seen so merged output keeps the single-file ordering.
+    species = {}
+    with open(input_file, 'r', newline='', encoding='utf-8') as infile:
+        for row_index, row in enumerate(csv.DictReader(infile)):
+            species_name = row['Species Name']
+            entry = species.get(species_name)
+            if entry is None:
+                entry = species[species_name] = {
+                    'order': (file_index, row_index),
+                    'Genus': row['Genus'],
+                    'Family': row['Family'],
+                    'Common Names': row['Common Names'],
+                    'Date': row['Date'],
+                    'Location': row['Location'],
+                    'Altitude': row['Altitude'],
+                    'organs': set(),
+                    'count': 0,
+                    'max_score': None,
+                    'first_date': None,
+                    'last_date': None,
+                    'box': None
+                }
+            _update(entry, row)
+    return species
+
+
+def merge_partials(target, partial):
+    for species_name, entry in partial.items():
+        current = target.get(species_name)
+        if current is None:
+            target[species_name] = entry
+            continue
+        first, other = (current, entry) if current['order'] <= entry['order'] else (entry, current)
+        first['organs'] |= other['organs']
+        first['count'] += other['count']
+        scores = [s for s in (first['max_score'], other['max_score']) if s is not None]
+        first['max_score'] = max(scores) if scores else None
+        dates = [d for d in (first['first_date'], other['first_date'], first['last_date'], other['last_date'])
+                 if d is not None]
+        first['first_date'] = min(dates) if dates else None
+        first['last_date'] = max(dates) if dates else None
+        boxes = [b for b in (first['box'], other['box']) if b is not None]
+        first['box'] = (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                        max(b[2] for b in boxes), max(b[3] for b in boxes)) if boxes else None
+        target[species_name] = first
+    return target
+
+
+def aggregate_files(input_files, workers=None):
+    # Each file is streamed by its own worker process; the small per-species partials are merged here.
+    species = {}
+    if len(input_files) == 1:
+        return aggregate_file(input_files[0])
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for partial in executor.map(aggregate_file, input_files, range(len(input_files))):
+            merge_partials(species, partial)
+    return dict(sorted(species.items(), key=lambda item: item[1]['order']))
+
+
+def extra_columns(entry):
+    box = entry['box'] or (None, None, None, None)
+    return {
+        'Image Count': entry['count'],
+        'Max Score': '' if entry['max_score'] is None else entry['max_score'],
+        'First Date': entry['first_date'] or '',
+        'Last Date': entry['last_date'] or '',
+        'Min Latitude': '' if box[0] is None else box[0],
+        'Max Latitude': '' if box[2] is None else box[2],
+        'Min Longitude': '' if box[1] is None else box[1],
+        'Max Longitude': '' if box[3] is None else box[3]
+    }
@@ -0,0 +1,189 @@
+import asyncio
+import os
+import aiohttp
+
+
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class AsyncPlantNetEndpoints:
+    def __init__(self, apikey, base_url="https://my-api.plantnet.org/v2/", pool_size=100, concurrency=50,
+                 timeout=120, session=None):
+        self.api_key = apikey
+        self.base_url = base_url
+        self.pool_size = pool_size
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.session = session
+
+
+    def _get_session(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=30)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout, auto_decompress=True)
+        return self.session
+
+
+    @staticmethod
+    def _params(params):
+        # aiohttp only accepts str/int/float values and repeats keys given as (key, value) pairs.
+        items = []
+        for key, value in params.items():
+            values = value if isinstance(value, (list, tuple)) else [value]
+            items.extend((key, v if isinstance(v, (int, float)) and not isinstance(v, bool) else str(v))
+                         for v in values)
+        return items
+
+
+    @staticmethod
+    async def _form(images):
+        data = aiohttp.FormData()
+        for image in images:
+            content = await asyncio.to_thread(_read_file, image)
+            data.add_field("images", content, filename=os.path.basename(image))
+        return data
+
+
+    async def _request(self, method, url, params=None, files=None, forbidden_message=False):
+        async with self.semaphore:
+            # Images are read only once a request slot is free, so waiting tasks hold no file contents.
+            data = await self._form(files) if files is not None else None
+            session = self._get_session()
+            async with session.request(method, url, params=self._params(params or {}), data=data) as response:
+                if response.status == 200:
+                    return await response.json()
+                elif forbidden_message and response.status == 403:
+                    return "403 Forbidden: Check your API key and permissions. You may need to subscribe to a plan."
+                else:
+                    response.raise_for_status()
+                    return None
+
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+
+    async def __aenter__(self):
+        return self
+
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+
+    async def _status(self):
+        url = self.base_url + "_status"
+        return await self._request("GET", url)
+
+
+    async def languages(self):
+        url = self.base_url + "languages"
+        params = {"api-key": self.api_key}
+        return await self._request("GET", url, params)
+
+
+    async def projects(self, lang="en", lat=None, lon=None, type="kt"):
+        url = self.base_url + "projects"
+        params = {
+            "api-key": self.api_key,
+            "lang": lang,
+            "type": type
+        }
+        if lat is not None:
+            params["lat"] = lat
+        if lon is not None:
+            params["lon"] = lon
+        return await self._request("GET", url, params)
+
+
+    async def species(self, lang="en", type="kt", pageSize=None, page=None, prefix=None):
+        url = self.base_url + "species"
+        params = {
+            "api-key": self.api_key,
+            "lang": lang,
+            "type": type
+        }
+        if pageSize is not None:
+            params["pageSize"] = pageSize
+        if page is not None:
+            params["page"] = page
+        if prefix is not None:
+            params["prefix"] = prefix
+        return await self._request("GET", url, params)
+
+
+    async def subscription(self):
+        url = self.base_url + "subscription"
+        params = {"api-key": self.api_key}
+        return await self._request("GET", url, params, forbidden_message=True)
+
+
+    async def identify_get(self, project="all", images=None, organs=None, include_related_images=False,
+                           no_reject=False, nb_results=10, lang="en", type="kt", authenix_access_token=None):
+        if images is None:
+            raise ValueError("Image URLs must be provided.")
+        url = self.base_url + "identify/" + project
+        params = {
+            "api-key": self.api_key,
+            "images": images,
+            "include-related-images": str(include_related_images).lower(),
+            "no-reject": str(no_reject).lower(),
+            "nb-results": nb_results,
+            "lang": lang,
+            "type": type
+        }
+        if organs is not None:
+            params["organs"] = organs
+        if authenix_access_token:
+            params["authenix-access-token"] = authenix_access_token
+        return await self._request("GET", url, params)
+
+
+    async def identify_post(self, project="all", images=None, organs=None, include_related_images=False,
+                            no_reject=False, nb_results=10, lang="en", type="kt", authenix_access_token=None):
+        if images is None:
+            raise ValueError("Images must be provided.")
+        url = self.base_url + "identify/" + project
+        params = {
+            "api-key": self.api_key,
+            "include-related-images": str(include_related_images).lower(),
+            "no-reject": str(no_reject).lower(),
+            "nb-results": nb_results,
+            "lang": lang,
+            "type": type
+        }
+        if organs is not None:
+            params["organs"] = organs
+        if authenix_access_token:
+            params["authenix-access-token"] = authenix_access_token
+        return await self._request("POST", url, params, files=images)
+
+
+    async def quota_daily(self, day):
+        url = self.base_url + "quota/daily"
+        params = {"api-key": self.api_key, "day": day}
+        return await self._request("GET", url, params)
+
+
+    async def quota_history(self, year):
+        url = self.base_url + "quota/history"
+        params = {"api-key": self.api_key, "year": year}
+        return await self._request("GET", url, params, forbidden_message=True)
+
+
+    async def projects_project_species(self, project, lang="en", pageSize=None, page=None, prefix=None):
+        url = self.base_url + f"projects/{project}/species"
+        params = {
+            "lang": lang,
+            "api-key": self.api_key
+        }
+        if pageSize is not None:
+            params["pageSize"] = pageSize
+        if page is not None:
+            params["page"] = page
+        if prefix is not None:
+            params["prefix"] = prefix
+        return await self._request("GET", url, params)
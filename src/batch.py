@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+class RateLimiter:
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError("Rate must be positive.")
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+
+def make_identifier(pne, rate=None, scheduler=None, **kwargs):
+    # Returns a thread-safe function sending one payload (or a list of payloads forming one
+    # observation) and returning (response, error), honouring the rate limit and quota scheduler.
+    limiter = RateLimiter(rate) if rate else None
+
+    def identify(payload):
+        if isinstance(payload, Exception):
+            return None, payload
+        payloads = payload if isinstance(payload, list) else [payload]
+        if scheduler is not None and getattr(pne, "cache", None) is not None:
+            # Cache hits are answered before the scheduler takes quota for them.
+            try:
+                cached = pne.cached_identify(images=payloads, **kwargs)
+            except Exception as e:
+                return None, e
+            if cached is not None:
+                return cached, None
+        attempt = 0
+        while True:
+            try:
+                if scheduler is not None:
+                    scheduler.acquire()
+                if limiter is not None:
+                    limiter.acquire()
+                response = pne.identify_post(images=payloads, **kwargs)
+            except Exception as e:
+                if scheduler is not None and scheduler.backoff(e, attempt):
+                    attempt += 1
+                    continue
+                return None, e
+            if scheduler is not None:
+                scheduler.record(response)
+            return response, None
+
+    return identify
+
+
+def until_exhausted(items, quota, pne=None):
+    # Stops pulling new inputs once the quota is gone so they are left for a later run. With a
+    # response cache all inputs are still pulled, as cached ones are answered without quota.
+    cached = getattr(pne, "cache", None) is not None
+    for item in items:
+        if quota is not None and quota.exhausted and not cached:
+            break
+        yield item
+
+
+def identify_batch(pne, images, workers=4, rate=None, ordered=True, preprocessor=None, scheduler=None, **kwargs):
+    identify = make_identifier(pne, rate=rate, scheduler=scheduler, **kwargs)
+    images = until_exhausted(images, scheduler, pne)
+    if preprocessor is not None:
+        items = preprocessor.map(images)
+    else:
+        items = ((image, image) for image in images)
+
+    def task(item):
+        image, payload = item
+        return (image,) + identify(payload)
+
+    # Keep a bounded number of submissions in flight so that lazily produced
+    # inputs are consumed as workers free up instead of all at once.
+    max_in_flight = workers * 2
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        if ordered:
+            pending = deque()
+            for item in items:
+                pending.append(executor.submit(task, item))
+                if len(pending) >= max_in_flight:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        else:
+            pending = set()
+            for item in items:
+                pending.add(executor.submit(task, item))
+                if len(pending) >= max_in_flight:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class ResponseCache:
+    def __init__(self, path="plantnet_cache.sqlite3", ttl=30 * 24 * 3600, max_entries=100000, evict_every=100):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self._writes = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+
+
+    @staticmethod
+    def make_key(digests, params):
+        payload = json.dumps({"images": list(digests), "params": params}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+    def get(self, key):
+        now = time.time()
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            response, created = row
+            if self.ttl is not None and now - created > self.ttl:
+                self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self.conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(response)
+
+
+    def set(self, key, response):
+        # The remaining quota is only meaningful for the live response, not for later cache hits.
+        if isinstance(response, dict):
+            response = {k: v for k, v in response.items() if k != "remainingIdentificationRequests"}
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(response), now, now)
+            )
+            self._writes += 1
+            if self._writes % self.evict_every == 0:
+                self._evict(now)
+
+
+    def _evict(self, now):
+        if self.ttl is not None:
+            self.conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        if self.max_entries is not None:
+            self.conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+
+    def clear(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM responses")
+
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class MetadataCache:
+    DEFAULT_TTLS = {"_status": 60, "languages": 24 * 3600, "projects": 6 * 3600}
+
+    def __init__(self, ttls=None, path=None, coordinate_step=0.5):
+        self.ttls = dict(self.DEFAULT_TTLS, **(ttls or {}))
+        self.path = path
+        self.coordinate_step = coordinate_step
+        self.lock = threading.Lock()
+        self.entries = {}
+        if path is not None and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.entries = {key: tuple(entry) for key, entry in json.load(f).items()}
+
+
+    def _bucket(self, value):
+        # Nearby coordinates share an entry by snapping them to a grid of coordinate_step degrees.
+        if value is None:
+            return None
+        return round(round(float(value) / self.coordinate_step) * self.coordinate_step, 6)
+
+
+    def make_key(self, endpoint, params=(), location=None):
+        if location is not None:
+            params = tuple(params) + tuple(self._bucket(value) for value in location)
+        return json.dumps([endpoint, list(params)])
+
+
+    def get(self, endpoint, params=(), location=None):
+        key = self.make_key(endpoint, params, location)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if time.time() >= expires:
+                del self.entries[key]
+                return None
+            return value
+
+
+    def set(self, endpoint, value, params=(), location=None):
+        key = self.make_key(endpoint, params, location)
+        with self.lock:
+            self.entries[key] = (time.time() + self.ttls.get(endpoint, 3600), value)
+            self._save()
+        return value
+
+
+    def invalidate(self, endpoint=None):
+        with self.lock:
+            if endpoint is None:
+                self.entries.clear()
+            else:
+                self.entries = {key: entry for key, entry in self.entries.items()
+                                if json.loads(key)[0] != endpoint}
+            self._save()
+
+
+    def _save(self):
+        if self.path is None:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
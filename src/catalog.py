@@ -0,0 +1,145 @@
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _items(response):
+    if isinstance(response, list):
+        return response
+    if isinstance(response, dict):
+        for value in response.values():
+            if isinstance(value, list):
+                return value
+    return []
+
+
+def _name(value):
+    if isinstance(value, dict):
+        return value.get("scientificNameWithoutAuthor") or value.get("scientificName")
+    return value
+
+
+class SpeciesCatalog:
+    def __init__(self, path="species_catalog.sqlite3"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS species ("
+                "source TEXT NOT NULL, name TEXT NOT NULL, name_lower TEXT NOT NULL, genus TEXT, family TEXT, "
+                "data TEXT NOT NULL, refreshed REAL NOT NULL, PRIMARY KEY (source, name))"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS species_name ON species (name_lower)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS species_genus ON species (genus)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS species_family ON species (family)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS sources (source TEXT PRIMARY KEY, refreshed REAL NOT NULL)")
+            # Species listings carry no family, so families are kept per genus as identifications report them.
+            self.conn.execute("CREATE TABLE IF NOT EXISTS genera (genus TEXT PRIMARY KEY, family TEXT NOT NULL)")
+
+
+    @staticmethod
+    def source(project=None, lang="en"):
+        return f"{project or '*'}:{lang}"
+
+
+    def _fetch_page(self, pne, project, lang, page, page_size):
+        if project is None:
+            return _items(pne.species(lang=lang, pageSize=page_size, page=page))
+        return _items(pne.projects_project_species(project, lang=lang, pageSize=page_size, page=page))
+
+
+    def download(self, pne, project=None, lang="en", page_size=500, workers=4, max_age=None):
+        source = self.source(project, lang)
+        with self.lock:
+            row = self.conn.execute("SELECT refreshed FROM sources WHERE source = ?", (source,)).fetchone()
+        if row is not None and max_age is not None and time.time() - row[0] < max_age:
+            return 0
+        started = time.time()
+        count = 0
+        page = 1
+        done = False
+        # Pages are fetched in windows of `workers` concurrent requests until a short page marks the end.
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while not done:
+                pages = range(page, page + workers)
+                for items in executor.map(lambda p: self._fetch_page(pne, project, lang, p, page_size), pages):
+                    if items:
+                        self._store(source, items, started)
+                        count += len(items)
+                    if len(items) < page_size:
+                        done = True
+                        break
+                page += workers
+        with self.lock, self.conn:
+            # Species that disappeared upstream are dropped; everything else was upserted above.
+            self.conn.execute("DELETE FROM species WHERE source = ? AND refreshed < ?", (source, started))
+            self.conn.execute("INSERT OR REPLACE INTO sources (source, refreshed) VALUES (?, ?)", (source, started))
+        print(f"Downloaded {count} species for {source}")
+        return count
+
+
+    def _store(self, source, items, refreshed):
+        rows = []
+        for item in items:
+            name = _name(item)
+            if not name:
+                continue
+            genus = _name(item.get("genus")) or name.split(" ")[0]
+            family = _name(item.get("family"))
+            rows.append((source, name, name.lower(), genus, family, json.dumps(item, ensure_ascii=False), refreshed))
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO species (source, name, name_lower, genus, family, data, refreshed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self.conn.executemany("INSERT OR REPLACE INTO genera (genus, family) VALUES (?, ?)",
+                                  {(row[3], row[4]) for row in rows if row[4]})
+
+
+    def add_families(self, response):
+        # Records the genus and family of every result of an identification response.
+        pairs = set()
+        for result in response.get("results", []) if isinstance(response, dict) else []:
+            species = result.get("species") or {}
+            genus, family = _name(species.get("genus")), _name(species.get("family"))
+            if genus and family:
+                pairs.add((genus, family))
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO genera (genus, family) VALUES (?, ?)", pairs)
+        return len(pairs)
+
+
+    def _query(self, where, args, limit=None):
+        sql = f"SELECT data FROM species WHERE {where} ORDER BY name"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self.lock:
+            return [json.loads(row[0]) for row in self.conn.execute(sql, args)]
+
+
+    def lookup(self, name):
+        found = self._query("name_lower = ?", (name.strip().lower(),), limit=1)
+        return found[0] if found else None
+
+
+    def search(self, prefix, limit=20):
+        # A range scan on the name index instead of LIKE, which SQLite cannot index here.
+        prefix = prefix.strip().lower()
+        return self._query("name_lower >= ? AND name_lower < ?", (prefix, prefix + "\uffff"), limit)
+
+
+    def by_genus(self, genus):
+        return self._query("genus = ?", (genus,))
+
+
+    def by_family(self, family):
+        # Only covers genera whose family was in the listing or was recorded with add_families.
+        return self._query("family = ? OR genus IN (SELECT genus FROM genera WHERE family = ?)", (family, family))
+
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,314 @@
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import sys
+import threading
+
+EXIT_OK = 0
+EXIT_ERRORS = 1
+EXIT_USAGE = 2
+EXIT_NO_INPUT = 3
+EXIT_QUOTA = 4
+EXIT_INTERRUPTED = 130
+
+DEFAULT_ENV_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api.env")
+
+
+class ProgressReporter:
+    # Prints a snapshot of a Progress object to stderr at a fixed interval, either as one JSON
+    # object per line for schedulers and log collectors or as a short human-readable line.
+    def __init__(self, progress, mode="text", interval=5.0):
+        self.progress = progress
+        self.mode = mode
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.report("progress")
+
+
+    def report(self, event, **extra):
+        if self.mode == "none":
+            return
+        status = dict(self.progress.snapshot(), **extra)
+        if self.mode == "json":
+            line = json.dumps(dict({"event": event}, **{key: round(value, 3) if isinstance(value, float) else value
+                                                           for key, value in status.items()}))
+        else:
+            total = f"/{status['total']}" if status["total"] is not None else ""
+            eta = f", ETA {status['eta']:.0f}s" if status["eta"] is not None else ""
+            line = (f"[{event}] {status['done']}{total} images, {status['rate']:.2f} images/s{eta}, "
+                    f"{status['errors']} errors")
+        print(line, file=sys.stderr, flush=True)
+
+
+    def __enter__(self):
+        if self.mode != "none":
+            self.thread.start()
+        return self
+
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+
+def api_key(args):
+    if args.api_key:
+        return args.api_key
+    if "Plant_Net_API" not in os.environ and os.path.exists(args.env_file):
+        from dotenv import load_dotenv
+        load_dotenv(args.env_file)
+    return os.environ.get("Plant_Net_API")
+
+
+def run_identify(args):
+    try:
+        from .endpoints import PlantNetEndpoints
+        from .keypool import KeyPool, split_keys
+        from .progress import Progress
+        from .quota import QuotaScheduler
+        from .scan import scan_images
+        from .utils import count_images, identify_images
+    except ImportError:
+        from endpoints import PlantNetEndpoints
+        from keypool import KeyPool, split_keys
+        from progress import Progress
+        from quota import QuotaScheduler
+        from scan import scan_images
+        from utils import count_images, identify_images
+    key = api_key(args)
+    if not key:
+        print("API key not found: pass --api-key, set Plant_Net_API or create api.env", file=sys.stderr)
+        return EXIT_USAGE
+    if not os.path.isdir(args.directory):
+        print(f"Directory does not exist: {args.directory}", file=sys.stderr)
+        return EXIT_NO_INPUT
+    image_files = scan_images(args.directory, recursive=args.recursive)
+    first = next(image_files, None)
+    if first is None:
+        print(f"No image files found in {args.directory}", file=sys.stderr)
+        return EXIT_NO_INPUT
+    cache = store = preprocessor = group = None
+    if args.cache:
+        try:
+            from .cache import ResponseCache
+        except ImportError:
+            from cache import ResponseCache
+        cache = ResponseCache(args.cache)
+    if args.store:
+        try:
+            from .results import ResultStore
+        except ImportError:
+            from results import ResultStore
+        store = ResultStore(args.store)
+    if args.max_side:
+        try:
+            from .preprocess import ImagePreprocessor
+        except ImportError:
+            from preprocess import ImagePreprocessor
+        preprocessor = ImagePreprocessor(max_side=args.max_side, quality=args.quality)
+    if args.group == "time":
+        try:
+            from .observations import group_by_time_location
+        except ImportError:
+            from observations import group_by_time_location
+        group = group_by_time_location
+    elif args.group == "folder":
+        try:
+            from .observations import group_by_folder
+        except ImportError:
+            from observations import group_by_folder
+        group = group_by_folder
+    hooks = []
+    collector = json_log = None
+    if args.metrics_file:
+        try:
+            from .metrics import MetricsCollector, PrometheusFileExporter
+        except ImportError:
+            from metrics import MetricsCollector, PrometheusFileExporter
+        collector = MetricsCollector()
+        hooks.append(collector)
+    if args.metrics_log:
+        try:
+            from .metrics import JsonLogExporter
+        except ImportError:
+            from metrics import JsonLogExporter
+        json_log = JsonLogExporter(args.metrics_log)
+        hooks.append(json_log)
+    output_file = args.output or os.path.join(args.directory, "results.csv")
+    progress = Progress()
+    count_images(progress, args.directory, recursive=args.recursive)
+    keys = split_keys(key)
+    with contextlib.ExitStack() as stack:
+        if len(keys) > 1:
+            # Each key of the pool has its own quota scheduler.
+            pne = quota = stack.enter_context(KeyPool(
+                keys, daily_limit=args.daily_limit, reserve=args.reserve, wait_for_reset=args.wait_for_reset,
+                pool_size=max(10, args.workers), base_url=args.base_url, cache=cache, hooks=hooks))
+            scheduler = None
+        else:
+            pne = stack.enter_context(PlantNetEndpoints(keys[0], base_url=args.base_url,
+                                                        pool_size=max(10, args.workers), cache=cache, hooks=hooks))
+            scheduler = quota = QuotaScheduler(pne, daily_limit=args.daily_limit, reserve=args.reserve,
+                                               wait_for_reset=args.wait_for_reset)
+        if collector is not None:
+            stack.enter_context(PrometheusFileExporter(collector, args.metrics_file, args.progress_interval))
+        # A key pool always reads the quota of its keys; one key only when limits were asked for.
+        if len(keys) > 1 or args.daily_limit is not None or args.reserve:
+            quota.refresh()
+        with ProgressReporter(progress, args.progress, args.progress_interval) as reporter:
+            identify_images(pne, itertools.chain([first], image_files), output_file,
+                            workers=args.workers, rate=args.rate, preprocessor=preprocessor, group=group,
+                            resume=args.resume, scheduler=scheduler, store=store, dedup=args.dedup,
+                            progress=progress, root=args.directory)
+            reporter.report("done", output=output_file, exhausted=quota.exhausted)
+    if store is not None:
+        store.close()
+    if cache is not None:
+        cache.close()
+    if json_log is not None:
+        json_log.close()
+    if quota.exhausted:
+        return EXIT_QUOTA
+    return EXIT_ERRORS if progress.snapshot()["errors"] else EXIT_OK
+
+
+def run_rename(args):
+    try:
+        from .utils import rename_to_species
+    except ImportError:
+        from utils import rename_to_species
+    if not os.path.isfile(args.csv_file):
+        print(f"CSV file does not exist: {args.csv_file}", file=sys.stderr)
+        return EXIT_NO_INPUT
+    moves, conflicts, failures = rename_to_species(args.csv_file, args.directory, args.suffix,
+                                                   dry_run=args.dry_run, workers=args.workers)
+    return EXIT_ERRORS if conflicts or failures else EXIT_OK
+
+
+def run_group(args):
+    try:
+        from .utils import group_by_species
+    except ImportError:
+        from utils import group_by_species
+    if not os.path.isdir(args.directory):
+        print(f"Directory does not exist: {args.directory}", file=sys.stderr)
+        return EXIT_NO_INPUT
+    moves, conflicts, failures = group_by_species(args.directory, dry_run=args.dry_run, workers=args.workers,
+                                                  recursive=args.recursive)
+    return EXIT_ERRORS if conflicts or failures else EXIT_OK
+
+
+def run_refactor(args):
+    try:
+        from .utils import refactor_results
+    except ImportError:
+        from utils import refactor_results
+    missing = [path for path in args.input_files if not os.path.isfile(path)]
+    if missing:
+        print(f"Input file does not exist: {', '.join(missing)}", file=sys.stderr)
+        return EXIT_NO_INPUT
+    refactor_results(args.input_files, output_file=args.output, workers=args.workers, extra=args.extra)
+    return EXIT_OK
+
+
+def run_merge(args):
+    try:
+        from .merge import merge_images
+    except ImportError:
+        from merge import merge_images
+    if not any(os.path.isdir(folder) for folder in args.sources):
+        print("None of the source folders exist.", file=sys.stderr)
+        return EXIT_NO_INPUT
+    merge_images(args.sources, args.destination, workers=args.workers, link=args.link, dedup=not args.no_dedup)
+    return EXIT_OK
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli", description="Headless Pl@ntNet batch tools.")
+    parser.add_argument("--quiet", action="store_true", help="suppress per-file log lines on stdout")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    identify = commands.add_parser("identify", help="identify all images in a directory")
+    identify.add_argument("directory")
+    identify.add_argument("-o", "--output", help="CSV file to write (default: DIRECTORY/results.csv)")
+    identify.add_argument("--api-key", help="API key, or several separated by commas "
+                               "(default: Plant_Net_API from the environment or api.env)")
+    identify.add_argument("--env-file", default=DEFAULT_ENV_FILE)
+    identify.add_argument("--base-url", default="https://my-api.plantnet.org/v2/")
+    identify.add_argument("-w", "--workers", type=int, default=4)
+    identify.add_argument("--rate", type=float, help="maximum requests per second")
+    identify.add_argument("-r", "--recursive", action="store_true")
+    identify.add_argument("--resume", action="store_true", help="skip images journaled by a previous run")
+    identify.add_argument("--dedup", action="store_true", help="submit identical files only once")
+    identify.add_argument("--group", choices=("time", "folder"), help="submit images as multi-image observations")
+    identify.add_argument("--cache", metavar="PATH", help="SQLite response cache")
+    identify.add_argument("--store", metavar="PATH", help="SQLite database for full results")
+    identify.add_argument("--max-side", type=int, help="downscale images to this many pixels before upload")
+    identify.add_argument("--quality", type=int, default=85)
+    identify.add_argument("--daily-limit", type=int)
+    identify.add_argument("--reserve", type=int, default=0, help="requests to leave unused in the daily quota")
+    identify.add_argument("--wait-for-reset", action="store_true", help="pause until the quota resets")
+    identify.add_argument("--progress", choices=("text", "json", "none"), default="text",
+                          help="progress lines on stderr")
+    identify.add_argument("--progress-interval", type=float, default=5.0)
+    identify.add_argument("--metrics-file", metavar="PATH", help="Prometheus text file with request metrics")
+    identify.add_argument("--metrics-log", metavar="PATH", help="JSON lines log with one record per API call")
+    identify.set_defaults(func=run_identify)
+
+    rename = commands.add_parser("rename", help="rename images to their identified species")
+    rename.add_argument("csv_file")
+    rename.add_argument("directory")
+    rename.add_argument("suffix")
+    rename.add_argument("--dry-run", action="store_true")
+    rename.add_argument("-w", "--workers", type=int, default=1)
+    rename.set_defaults(func=run_rename)
+
+    group = commands.add_parser("group", help="move renamed images into species folders")
+    group.add_argument("directory")
+    group.add_argument("--dry-run", action="store_true")
+    group.add_argument("-r", "--recursive", action="store_true", help="also group images in subfolders")
+    group.add_argument("-w", "--workers", type=int, default=1)
+    group.set_defaults(func=run_group)
+
+    refactor = commands.add_parser("refactor", help="aggregate result CSVs per species")
+    refactor.add_argument("input_files", nargs="+")
+    refactor.add_argument("-o", "--output")
+    refactor.add_argument("-w", "--workers", type=int)
+    refactor.add_argument("--extra", action="store_true", help="add counts, score and date range columns")
+    refactor.set_defaults(func=run_refactor)
+
+    merge = commands.add_parser("merge", help="merge species folders into one directory")
+    merge.add_argument("destination")
+    merge.add_argument("sources", nargs="+")
+    merge.add_argument("-w", "--workers", type=int, default=4)
+    merge.add_argument("--link", choices=("hard", "reflink"))
+    merge.add_argument("--no-dedup", action="store_true")
+    merge.set_defaults(func=run_merge)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        with contextlib.ExitStack() as stack:
+            if args.quiet:
+                stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+            return args.func(args)
+    except KeyboardInterrupt:
+        print("Interrupted.", file=sys.stderr)
+        return EXIT_INTERRUPTED
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return EXIT_ERRORS
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+import threading
+try:
+    from .hashing import DigestCache
+except ImportError:
+    from hashing import DigestCache
+
+
+class Deduplicator:
+    def __init__(self, digest_cache=None):
+        self.digest_cache = digest_cache if digest_cache is not None else DigestCache()
+        self.lock = threading.Lock()
+        self.originals = {}
+        self.digest_of = {}
+        self.waiting = {}
+        self.finished = {}
+        self.duplicates = 0
+
+
+    def digest(self, image):
+        try:
+            return self.digest_cache.digest(image)
+        except OSError:
+            return None
+
+
+    def filter(self, images):
+        # Yields the first image of every distinct content; later copies are held back until
+        # the original's result can be fanned out to them.
+        for image in images:
+            digest = self.digest(image)
+            if digest is not None:
+                with self.lock:
+                    if digest in self.originals:
+                        self.waiting.setdefault(digest, []).append(image)
+                        self.duplicates += 1
+                        continue
+                    self.originals[digest] = image
+                    self.digest_of[image] = digest
+            yield image
+
+
+    def finish(self, image, result):
+        # Records the result of an original and returns the duplicates already waiting for it.
+        with self.lock:
+            digest = self.digest_of.get(image)
+            if digest is None:
+                return []
+            self.finished[digest] = result
+            return self.waiting.pop(digest, [])
+
+
+    def leftovers(self):
+        # Duplicates that were found after their original had already finished.
+        with self.lock:
+            pending = [(duplicate, self.finished[digest])
+                       for digest, duplicates in self.waiting.items() if digest in self.finished
+                       for duplicate in duplicates]
+            self.waiting.clear()
+        return pending
+
+
+    def report(self):
+        if self.duplicates:
+            print(f"Skipped {self.duplicates} duplicate images, saving {self.duplicates} identification requests.")
@@ -1,34 +1,178 @@
 import requests
 import contextlib
+import threading
+import time
+from requests.adapters import HTTPAdapter
+try:
+    from .hashing import file_digest, bytes_digest
+    from .metrics import call_record, endpoint_name
+    from .retry import RetryPolicy
+except ImportError:
+    from hashing import file_digest, bytes_digest
+    from metrics import call_record, endpoint_name
+    from retry import RetryPolicy
 
 class PlantNetEndpoints:
-    def __init__(self, apikey):
+    def __init__(self, apikey, base_url="https://my-api.plantnet.org/v2/", pool_size=10, timeout=(10, 120),
+                 compress=True, session=None, cache=None, preprocessor=None, retry=None, circuit_breaker=None,
+                 metadata_cache=None, hooks=None):
         self.api_key = apikey
-        self.base_url = "https://my-api.plantnet.org/v2/"
+        self.base_url = base_url
+        self.timeout = timeout
+        self.cache = cache
+        self.preprocessor = preprocessor
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.circuit_breaker = circuit_breaker
+        self.metadata_cache = metadata_cache
+        self.hooks = list(hooks) if hooks is not None else []
+        self._local = threading.local()
+        self.session = session if session is not None else self._create_session(pool_size, compress)
 
 
-    def _status(self):
+    @staticmethod
+    def _create_session(pool_size, compress):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers["Connection"] = "keep-alive"
+        session.headers["Accept-Encoding"] = "gzip, deflate" if compress else "identity"
+        return session
+
+
+    def _request(self, method, url, params=None, files=None, timeout=None):
+        attempt = 0
+        started = time.perf_counter()
+        response = error = taken = None
+        try:
+            while True:
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.before_call(self._probe)
+                error = None
+                try:
+                    sent = time.perf_counter()
+                    response = self.session.request(method, url, params=params, files=files,
+                                                    timeout=timeout or self.timeout)
+                    taken = time.perf_counter() - sent
+                    failed = response.status_code in self.retry.retry_statuses
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    response = None
+                    error = e
+                    failed = True
+                if self.circuit_breaker is not None:
+                    if failed:
+                        self.circuit_breaker.record_failure()
+                    else:
+                        self.circuit_breaker.record_success()
+                if failed and self.retry.should_retry(method, attempt):
+                    time.sleep(self.retry.delay(attempt))
+                    attempt += 1
+                    for _, (_, content) in files or []:
+                        if hasattr(content, "seek"):
+                            content.seek(0)
+                    continue
+                if error is not None:
+                    raise error
+                return response
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if self.hooks:
+                self._emit(call_record(endpoint_name(self.base_url, url), method, response, error,
+                                       time.perf_counter() - started, taken, attempt))
+
+
+    def _emit(self, record):
+        for hook in self.hooks:
+            try:
+                hook(record)
+            except Exception as e:
+                print(f"Metrics hook failed: {e}")
+
+
+    def _probe(self):
+        self.session.get(self.base_url + "_status", timeout=self.timeout).raise_for_status()
+
+
+    def _get(self, url, params=None, timeout=None):
+        return self._request("GET", url, params=params, timeout=timeout)
+
+
+    def _post(self, url, params=None, files=None, timeout=None):
+        return self._request("POST", url, params=params, files=files, timeout=timeout)
+
+
+    def _payload(self, image):
+        # Images are file paths or already encoded (filename, bytes) pairs.
+        if isinstance(image, tuple):
+            return image
+        if self.preprocessor is not None:
+            return self.preprocessor(image)
+        return image
+
+
+    @property
+    def last_call_cached(self):
+        # Whether the last identify_post made from the current thread was answered from the cache.
+        return getattr(self._local, "cache_hit", False)
+
+
+    def _cached(self, endpoint, params=(), location=None):
+        if self.metadata_cache is None:
+            return None
+        return self.metadata_cache.get(endpoint, params, location)
+
+
+    def _remember(self, endpoint, value, params=(), location=None):
+        if self.metadata_cache is None:
+            return value
+        return self.metadata_cache.set(endpoint, value, params, location)
+
+
+    def close(self):
+        self.session.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    def _status(self, timeout=None):
+        cached = self._cached("_status")
+        if cached is not None:
+            return cached
         url = self.base_url + "_status"
-        response = requests.get(url)
+        response = self._get(url, timeout=timeout)
         if response.status_code == 200:
-            return response.json()
+            return self._remember("_status", response.json())
         else:
             response.raise_for_status()
             return None
 
 
-    def languages(self):
+    def languages(self, timeout=None):
+        cached = self._cached("languages")
+        if cached is not None:
+            return cached
         url = self.base_url + "languages"
         params = {"api-key": self.api_key}
-        response = requests.get(url, params=params)
+        response = self._get(url, params=params, timeout=timeout)
         if response.status_code == 200:
-            return response.json()
+            return self._remember("languages", response.json())
         else:
             response.raise_for_status()
             return None
 
 
-    def projects(self, lang="en", lat=None, lon=None, type="kt"):
+    def projects(self, lang="en", lat=None, lon=None, type="kt", timeout=None):
+        cached = self._cached("projects", (lang, type), (lat, lon))
+        if cached is not None:
+            return cached
         url = self.base_url + "projects"
         params = {
             "api-key": self.api_key,
@@ -39,15 +183,15 @@ class PlantNetEndpoints:
             params["lat"] = lat
         if lon is not None:
             params["lon"] = lon
-        response = requests.get(url, params=params)
+        response = self._get(url, params=params, timeout=timeout)
         if response.status_code == 200:
-            return response.json()
+            return self._remember("projects", response.json(), (lang, type), (lat, lon))
         else:
             response.raise_for_status()
             return None
 
 
-    def species(self, lang="en", type="kt", pageSize=None, page=None, prefix=None):
+    def species(self, lang="en", type="kt", pageSize=None, page=None, prefix=None, timeout=None):
         url = self.base_url + "species"
         params = {
             "api-key": self.api_key,
@@ -60,7 +204,7 @@ class PlantNetEndpoints:
             params["page"] = page
         if prefix is not None:
             params["prefix"] = prefix
-        response = requests.get(url, params=params)
+        response = self._get(url, params=params, timeout=timeout)
         if response.status_code == 200:
             return response.json()
         else:
@@ -68,10 +212,10 @@ class PlantNetEndpoints:
             return None
 
 
-    def subscription(self):
+    def subscription(self, timeout=None):
         url = self.base_url + "subscription"
         params = {"api-key": self.api_key}
-        response = requests.get(url, params=params)
+        response = self._get(url, params=params, timeout=timeout)
         if response.status_code == 200:
             return response.json()
         elif response.status_code == 403:
@@ -82,7 +226,7 @@ class PlantNetEndpoints:
 
 
     def identify_get(self, project="all", images=None, organs=None, include_related_images=False, no_reject=False,
-                     nb_results=10, lang="en", type="kt", authenix_access_token=None):
+                     nb_results=10, lang="en", type="kt", authenix_access_token=None, timeout=None):
         if images is None:
             raise ValueError("Image URLs must be provided.")
         url = self.base_url + "identify/" + project
@@ -99,7 +243,7 @@ class PlantNetEndpoints:
             params["organs"] = organs
         if authenix_access_token:
             params["authenix-access-token"] = authenix_access_token
-        response = requests.get(url, params=params)
+        response = self._get(url, params=params, timeout=timeout)
         if response.status_code == 200:
             return response.json()
         else:
@@ -107,11 +251,8 @@ class PlantNetEndpoints:
             return None
 
 
-    def identify_post(self, project="all", images=None, organs=None, include_related_images=False, no_reject=False,
-                      nb_results=10, lang="en", type="kt", authenix_access_token=None):
-        if images is None:
-            raise ValueError("Images must be provided.")
-        url = self.base_url + "identify/" + project
+    def _identify_params(self, organs, include_related_images, no_reject, nb_results, lang, type,
+                         authenix_access_token):
         params = {
             "api-key": self.api_key,
             "include-related-images": str(include_related_images).lower(),
@@ -124,23 +265,74 @@ class PlantNetEndpoints:
             params["organs"] = organs
         if authenix_access_token:
             params["authenix-access-token"] = authenix_access_token
+        return params
+
+
+    def _lookup(self, project, images, params):
+        # Returns the cache key and the cached response, if any, for one identification. The key
+        # uses the source files and the preprocessing settings rather than the re-encoded upload,
+        # so hits skip preprocessing and stay valid when the JPEG encoder changes.
+        self._local.cache_hit = False
+        if self.cache is None:
+            return None, None
+        key_params = {k: v for k, v in params.items() if k not in ("api-key", "authenix-access-token")}
+        key_params["project"] = project
+        if self.preprocessor is not None and any(not isinstance(image, tuple) for image in images):
+            key_params["preprocess"] = [getattr(self.preprocessor, "max_side", None),
+                                        getattr(self.preprocessor, "quality", None)]
+        digests = [bytes_digest(image[1]) if isinstance(image, tuple) else file_digest(image) for image in images]
+        cache_key = self.cache.make_key(digests, key_params)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            self._local.cache_hit = True
+            if self.hooks:
+                self._emit(call_record("identify/{project}", "POST", cache_hit=True))
+        return cache_key, cached
+
+
+    def cached_identify(self, project="all", images=None, organs=None, include_related_images=False,
+                        no_reject=False, nb_results=10, lang="en", type="kt", authenix_access_token=None,
+                        timeout=None):
+        # The cached response identify_post would return for these arguments, or None. Quota
+        # schedulers ask first so that images answered from the cache never take any quota.
+        if images is None:
+            raise ValueError("Images must be provided.")
+        params = self._identify_params(organs, include_related_images, no_reject, nb_results, lang, type,
+                                       authenix_access_token)
+        return self._lookup(project, images, params)[1]
+
+
+    def identify_post(self, project="all", images=None, organs=None, include_related_images=False, no_reject=False,
+                      nb_results=10, lang="en", type="kt", authenix_access_token=None, timeout=None):
+        if images is None:
+            raise ValueError("Images must be provided.")
+        url = self.base_url + "identify/" + project
+        params = self._identify_params(organs, include_related_images, no_reject, nb_results, lang, type,
+                                       authenix_access_token)
+        cache_key, cached = self._lookup(project, images, params)
+        if cached is not None:
+            return cached
+        payloads = [self._payload(image) for image in images]
         with contextlib.ExitStack() as stack:
             files = [
-                ("images", (image, stack.enter_context(open(image, "rb"))))
-                for image in images
+                ("images", payload if isinstance(payload, tuple) else (payload, stack.enter_context(open(payload, "rb"))))
+                for payload in payloads
             ]
-            response = requests.post(url, params=params, files=files)
+            response = self._post(url, params=params, files=files, timeout=timeout)
         if response.status_code == 200:
-            return response.json()
+            result = response.json()
+            if cache_key is not None:
+                self.cache.set(cache_key, result)
+            return result
         else:
             response.raise_for_status()
             return None
 
 
-    def quota_daily(self, day):
+    def quota_daily(self, day, timeout=None):
         url = self.base_url + "quota/daily"
         params = {"api-key": self.api_key, "day": day}
-        response = requests.get(url, params=params)
+        response = self._get(url, params=params, timeout=timeout)
         if response.status_code == 200:
             return response.json()
         else:
@@ -148,10 +340,10 @@ class PlantNetEndpoints:
             return None
 
 
-    def quota_history(self, year):
+    def quota_history(self, year, timeout=None):
         url = self.base_url + "quota/history"
         params = {"api-key": self.api_key, "year": year}
-        response = requests.get(url, params=params)
+        response = self._get(url, params=params, timeout=timeout)
         if response.status_code == 200:
             return response.json()
         elif response.status_code == 403:
@@ -161,7 +353,7 @@ class PlantNetEndpoints:
             return None
 
 
-    def projects_project_species(self, project, lang="en", pageSize=None, page=None, prefix=None):
+    def projects_project_species(self, project, lang="en", pageSize=None, page=None, prefix=None, timeout=None):
         url = self.base_url + f"projects/{project}/species"
         params = {
             "lang": lang,
@@ -173,7 +365,7 @@ class PlantNetEndpoints:
             params["page"] = page
         if prefix is not None:
             params["prefix"] = prefix
-        response = requests.get(url, params=params)
+        response = self._get(url, params=params, timeout=timeout)
         if response.status_code == 200:
             return response.json()
         else:
@@ -0,0 +1,193 @@
+import json
+import os
+import sqlite3
+import struct
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+EXIF_IFD_POINTER = 0x8769
+GPS_IFD_POINTER = 0x8825
+DATE_TIME_ORIGINAL = 0x9003
+TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 7: 1, 9: 4, 10: 8, 13: 4}
+
+
+def read_exif_segment(path):
+    # Reads only the marker headers of a JPEG up to the APP1 Exif segment, or the eXIf chunk
+    # of a PNG, and returns the raw TIFF block without decoding any pixel data.
+    with open(path, "rb") as f:
+        head = f.read(8)
+        if head[:2] == b"\xff\xd8":
+            f.seek(2)
+            while True:
+                marker = f.read(4)
+                if len(marker) < 4 or marker[0] != 0xFF:
+                    return None
+                kind, length = marker[1], struct.unpack(">H", marker[2:])[0]
+                if kind == 0xDA or kind == 0xD9:
+                    return None
+                if kind == 0xE1:
+                    data = f.read(length - 2)
+                    if data.startswith(b"Exif\x00\x00"):
+                        return data[6:]
+                else:
+                    f.seek(length - 2, os.SEEK_CUR)
+        if head == b"\x89PNG\r\n\x1a\n":
+            while True:
+                chunk = f.read(8)
+                if len(chunk) < 8:
+                    return None
+                length, kind = struct.unpack(">I4s", chunk)
+                if kind == b"eXIf":
+                    data = f.read(length)
+                    return data[6:] if data.startswith(b"Exif\x00\x00") else data
+                if kind in (b"IDAT", b"IEND"):
+                    return None
+                f.seek(length + 4, os.SEEK_CUR)
+    return None
+
+
+class _Tiff:
+    def __init__(self, data):
+        self.data = data
+        self.order = "<" if data[:2] == b"II" else ">"
+
+
+    def unpack(self, fmt, offset):
+        return struct.unpack_from(self.order + fmt, self.data, offset)
+
+
+    def ifd(self, offset):
+        entries = {}
+        count = self.unpack("H", offset)[0]
+        for i in range(count):
+            tag, kind, n, value = self.unpack("HHI4s", offset + 2 + i * 12)
+            entries[tag] = (kind, n, value, offset + 2 + i * 12 + 8)
+        return entries
+
+
+    def value(self, entry):
+        kind, n, raw, raw_offset = entry
+        size = TYPE_SIZES.get(kind, 1) * n
+        offset = raw_offset if size <= 4 else self.unpack("I", raw_offset)[0]
+        if kind == 2:
+            return self.data[offset:offset + n].split(b"\x00", 1)[0].decode("ascii", "replace")
+        if kind in (5, 10):
+            fmt = "I" if kind == 5 else "i"
+            values = []
+            for i in range(n):
+                num, den = self.unpack(fmt * 2, offset + i * 8)
+                values.append(num / den if den else 0.0)
+            return values
+        if kind in (1, 7):
+            return list(self.data[offset:offset + n])
+        fmt = {3: "H", 4: "I", 9: "i", 13: "I"}.get(kind)
+        return [self.unpack(fmt, offset + i * struct.calcsize(fmt))[0] for i in range(n)] if fmt else None
+
+
+def _dms(values, ref):
+    d, m, s = values
+    dms = f"{int(d)}:{int(m)}:{repr(s)}"
+    degrees = d + m / 60 + s / 3600
+    if ref in ("S", "W"):
+        return f"-{dms}", -degrees
+    return dms, degrees
+
+
+def dms_to_degrees(dms):
+    sign = -1 if dms.startswith("-") else 1
+    d, m, s = (float(part) for part in dms.lstrip("-").split(":"))
+    return sign * (d + m / 60 + s / 3600)
+
+
+def read_metadata(path):
+    metadata = {"date": None, "latitude": None, "longitude": None, "altitude": None, "location": None}
+    data = read_exif_segment(path)
+    if not data:
+        return metadata
+    tiff = _Tiff(data)
+    ifd0 = tiff.ifd(tiff.unpack("I", 4)[0])
+    if EXIF_IFD_POINTER in ifd0:
+        exif_ifd = tiff.ifd(tiff.value(ifd0[EXIF_IFD_POINTER])[0])
+        if DATE_TIME_ORIGINAL in exif_ifd:
+            metadata["date"] = tiff.value(exif_ifd[DATE_TIME_ORIGINAL])
+    if GPS_IFD_POINTER in ifd0:
+        gps = tiff.ifd(tiff.value(ifd0[GPS_IFD_POINTER])[0])
+        if 1 in gps and 2 in gps and 3 in gps and 4 in gps:
+            lat_dms, metadata["latitude"] = _dms(tiff.value(gps[2]), tiff.value(gps[1]))
+            lon_dms, metadata["longitude"] = _dms(tiff.value(gps[4]), tiff.value(gps[3]))
+            metadata["location"] = f"{lat_dms}, {lon_dms}"
+        if 6 in gps:
+            altitude = tiff.value(gps[6])[0]
+            if 5 in gps and tiff.value(gps[5])[0] == 1:
+                altitude = -altitude
+            metadata["altitude"] = altitude
+    return metadata
+
+
+def _read_metadata_safe(path):
+    try:
+        return read_metadata(path)
+    except (OSError, struct.error, ValueError, TypeError, IndexError) as e:
+        return {"error": str(e)}
+
+
+class ExifCache:
+    def __init__(self, path="exif_cache.sqlite3"):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS exif ("
+                "path TEXT PRIMARY KEY, mtime INTEGER NOT NULL, size INTEGER NOT NULL, metadata TEXT NOT NULL)"
+            )
+
+
+    @staticmethod
+    def _stat(path):
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+
+    def get(self, path):
+        try:
+            mtime, size = self._stat(path)
+        except OSError:
+            return None
+        with self.lock:
+            row = self.conn.execute("SELECT mtime, size, metadata FROM exif WHERE path = ?",
+                                    (os.path.abspath(path),)).fetchone()
+        if row is None or row[0] != mtime or row[1] != size:
+            return None
+        return json.loads(row[2])
+
+
+    def set(self, path, metadata):
+        mtime, size = self._stat(path)
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO exif (path, mtime, size, metadata) VALUES (?, ?, ?, ?)",
+                              (os.path.abspath(path), mtime, size, json.dumps(metadata)))
+
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def extract_metadata(paths, workers=None, cache=None, chunksize=64):
+    # Cached entries are answered directly; the rest are parsed in a process pool.
+    # Results are returned as a dict keyed by path.
+    results = {}
+    missing = []
+    for path in paths:
+        cached = cache.get(path) if cache is not None else None
+        if cached is not None:
+            results[path] = cached
+        else:
+            missing.append(path)
+    if missing:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for path, metadata in zip(missing, executor.map(_read_metadata_safe, missing, chunksize=chunksize)):
+                results[path] = metadata
+                if cache is not None and "error" not in metadata:
+                    cache.set(path, metadata)
+    return results
@@ -1,27 +1,52 @@
 import os
+import queue
 import sys
 import threading
 import tkinter as tk
 from tkinter import filedialog, simpledialog, messagebox, scrolledtext
 from tkinter import ttk
 from dotenv import load_dotenv
-from endpoints import PlantNetEndpoints
+from keypool import make_client
+from progress import Progress
+
+LOG_INTERVAL_MS = 100
+LOG_BATCH = 1000
+LOG_MAX_LINES = 5000
+
+current_progress = None
 
 
 class GuiOutput:
-    def __init__(self, text_widget):
+    # write() may be called from any thread and only queues the message; the Tk main loop
+    # drains the queue on a timer and inserts each batch with a single widget update.
+    def __init__(self, text_widget, max_lines=LOG_MAX_LINES):
         self.text_widget = text_widget
+        self.max_lines = max_lines
+        self.messages = queue.SimpleQueue()
 
     def write(self, message):
-        self.text_widget.configure(state=tk.NORMAL)
-        self.text_widget.insert(tk.END, message)
-        self.text_widget.see(tk.END)
-        self.text_widget.update_idletasks()
-        self.text_widget.configure(state=tk.DISABLED)
+        self.messages.put(message)
 
     def flush(self):
         pass
 
+    def drain(self):
+        batch = []
+        try:
+            while len(batch) < LOG_BATCH:
+                batch.append(self.messages.get_nowait())
+        except queue.Empty:
+            pass
+        if batch:
+            self.text_widget.configure(state=tk.NORMAL)
+            self.text_widget.insert(tk.END, "".join(batch))
+            lines = int(self.text_widget.index("end-1c").split(".")[0])
+            if lines > self.max_lines:
+                self.text_widget.delete("1.0", f"{lines - self.max_lines + 1}.0")
+            self.text_widget.see(tk.END)
+            self.text_widget.configure(state=tk.DISABLED)
+        self.text_widget.after(LOG_INTERVAL_MS, self.drain)
+
 
 def create_log_widget(root):
     log_frame = ttk.Frame(root, padding=10)
@@ -38,9 +63,39 @@ def create_log_widget(root):
     return log_text
 
 
+def create_progress_widget(root):
+    progress_frame = ttk.Frame(root, padding=(10, 0))
+    progress_frame.pack(fill=tk.X)
+    bar = ttk.Progressbar(progress_frame, mode="determinate")
+    bar.pack(side=tk.LEFT, fill=tk.X, expand=True)
+    label = ttk.Label(progress_frame, text="Idle", width=60, font=('Segoe UI', 10))
+    label.pack(side=tk.LEFT, padx=10)
+    return bar, label
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def update_progress(bar, label):
+    if current_progress is not None:
+        status = current_progress.snapshot()
+        total = status["total"]
+        if total:
+            bar.configure(maximum=total, value=min(status["done"], total))
+            done = f"{status['done']}/{total}"
+        else:
+            done = f"{status['done']}"
+        eta = format_duration(status["eta"]) if status["eta"] is not None else "--:--:--"
+        label.configure(text=f"{done} images, {status['rate']:.2f} images/s, ETA {eta}, {status['errors']} errors")
+    bar.after(500, update_progress, bar, label)
+
+
 def docs():
     items = [
-        r"Set API Key: Save your API key here",
+        r"Set API Key: Save your API key here, several keys can be separated by commas",
         r"Reset API Key: Remove the saved API key",
         r"Identify Images: Select the directory with images to identify",
         r"Rename Images: Be sure that you reviewed results. Rename images based on species, select CSV and directory and enter your initials (first letter of your name and surname)",
@@ -58,7 +113,7 @@ def docs():
 
 
 def set_api_key():
-    api_key = simpledialog.askstring(r"API Key", r"Enter your API key:")
+    api_key = simpledialog.askstring(r"API Key", r"Enter your API key (separate several keys with commas):")
     if api_key:
         with open("../api.env", "w", encoding="utf-8") as f:
             f.write(f"Plant_Net_API={api_key}")
@@ -76,6 +131,10 @@ def reset_api_key():
 
 
 def run_identify_images():
+    global current_progress
+    progress = Progress()
+    current_progress = progress
+
     def task():
         load_dotenv("../api.env")
         api_key = os.environ.get("Plant_Net_API")
@@ -83,8 +142,8 @@ def run_identify_images():
             print("API key not found in api.env")
             return
         from utils import identify_images_api
-        pne = PlantNetEndpoints(api_key)
-        identify_images_api(pne)
+        pne = make_client(api_key)
+        identify_images_api(pne, progress=progress)
     threading.Thread(target=task, daemon=True).start()
 
 
@@ -162,7 +221,11 @@ btn_move.pack(side=tk.LEFT, padx=10)
 btn_transposed = ttk.Button(button_frame, text="Transform Results", command=run_refactor_results, width=20)
 btn_transposed.pack(side=tk.LEFT, padx=10)
 
+progress_bar, progress_label = create_progress_widget(root)
 log_text = create_log_widget(root)
-sys.stdout = GuiOutput(log_text)
-sys.stderr = GuiOutput(log_text)
+gui_output = GuiOutput(log_text)
+sys.stdout = gui_output
+sys.stderr = gui_output
+gui_output.drain()
+update_progress(progress_bar, progress_label)
 root.mainloop()
\ No newline at end of file
@@ -0,0 +1,47 @@
+import hashlib
+import os
+import sqlite3
+import threading
+
+
+def file_digest(path, chunk_size=1 << 20):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def bytes_digest(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class DigestCache:
+    # Remembers file digests keyed by path, mtime and size so unchanged files are not re-read.
+    def __init__(self, path=":memory:"):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS digests ("
+                "path TEXT PRIMARY KEY, mtime INTEGER NOT NULL, size INTEGER NOT NULL, digest TEXT NOT NULL)"
+            )
+
+
+    def digest(self, path):
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        with self.lock:
+            row = self.conn.execute("SELECT mtime, size, digest FROM digests WHERE path = ?", (key,)).fetchone()
+        if row is not None and row[0] == stat.st_mtime_ns and row[1] == stat.st_size:
+            return row[2]
+        digest = file_digest(path)
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO digests (path, mtime, size, digest) VALUES (?, ?, ?, ?)",
+                              (key, stat.st_mtime_ns, stat.st_size, digest))
+        return digest
+
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,73 @@
+import json
+import os
+try:
+    from .hashing import file_digest
+except ImportError:
+    from hashing import file_digest
+
+
+class Journal:
+    def __init__(self, path):
+        self.path = path
+        self.entries = self._load()
+        self.file = open(path, "a", encoding="utf-8")
+        if self._ends_mid_line():
+            self.file.write("\n")
+
+
+    def _load(self):
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash can leave the last line half written.
+                    continue
+                entries[entry["image"]] = entry
+        return entries
+
+
+    def _ends_mid_line(self):
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+
+
+    def completed(self, image):
+        entry = self.entries.get(os.path.abspath(image))
+        if entry is None:
+            return None
+        try:
+            stat = os.stat(image)
+        except OSError:
+            return None
+        if stat.st_size != entry["size"]:
+            return None
+        if stat.st_mtime_ns != entry["mtime"] and file_digest(image) != entry["digest"]:
+            return None
+        return entry["row"]
+
+
+    def record(self, image, row):
+        stat = os.stat(image)
+        entry = {
+            "image": os.path.abspath(image),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "digest": file_digest(image),
+            "row": row
+        }
+        self.file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.entries[entry["image"]] = entry
+
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,209 @@
+import threading
+import time
+import requests
+try:
+    from .endpoints import PlantNetEndpoints
+    from .quota import QuotaExhausted, QuotaScheduler, seconds_until_reset
+except ImportError:
+    from endpoints import PlantNetEndpoints
+    from quota import QuotaExhausted, QuotaScheduler, seconds_until_reset
+
+REJECTED_STATUSES = (401, 403)
+
+
+def split_keys(api_keys):
+    # Accepts a list of keys or one comma-separated string, as stored in api.env.
+    if isinstance(api_keys, str):
+        api_keys = api_keys.split(",")
+    keys = []
+    for key in api_keys:
+        key = key.strip()
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+def mask_key(key):
+    return f"{key[:4]}..." if len(key) > 8 else "..."
+
+
+class KeyPool:
+    # Spreads identifications over several API keys. Every key has its own QuotaScheduler; a call
+    # goes to the usable key with the most quota left and the fewest calls in flight, and moves on
+    # to another key when one is throttled, out of quota or rejected. Other endpoints are
+    # answered by the first key that has not been rejected.
+    def __init__(self, api_keys, daily_limit=None, reserve=0, wait_for_reset=False, max_backoff=300,
+                 max_retries=5, pool_size=10, compress=True, session=None, **kwargs):
+        keys = split_keys(api_keys)
+        if not keys:
+            raise ValueError("At least one API key must be provided.")
+        self.session = session if session is not None else PlantNetEndpoints._create_session(pool_size, compress)
+        self.clients = [PlantNetEndpoints(key, session=self.session, **kwargs) for key in keys]
+        self.schedulers = [QuotaScheduler(client, daily_limit=daily_limit, reserve=reserve, max_backoff=max_backoff,
+                                          max_retries=max_retries) for client in self.clients]
+        self.wait_for_reset = wait_for_reset
+        self.in_flight = [0] * len(keys)
+        self.rejected = [False] * len(keys)
+        self.exhausted = False
+        self.lock = threading.Lock()
+        self._local = threading.local()
+
+
+    def __len__(self):
+        return len(self.clients)
+
+
+    def refresh(self):
+        for index, (client, scheduler) in enumerate(zip(self.clients, self.schedulers)):
+            try:
+                scheduler.refresh()
+            except requests.HTTPError as e:
+                if e.response is not None and e.response.status_code in REJECTED_STATUSES:
+                    self._reject(index, e.response.status_code)
+                else:
+                    print(f"Could not read the quota of API key {mask_key(client.api_key)}: {e}")
+            except requests.RequestException as e:
+                print(f"Could not read the quota of API key {mask_key(client.api_key)}: {e}")
+        return self.status()
+
+
+    def _reject(self, index, status):
+        with self.lock:
+            self.rejected[index] = True
+        print(f"API key {mask_key(self.clients[index].api_key)} was rejected ({status}), using the other keys.")
+
+
+    def _pick(self):
+        # Returns the index of the best usable key, or the seconds until one is unpaused,
+        # or None when every key is exhausted or rejected.
+        now = time.monotonic()
+        best = None
+        best_score = None
+        wait = None
+        for index, scheduler in enumerate(self.schedulers):
+            if self.rejected[index] or scheduler.exhausted:
+                continue
+            if scheduler.paused_until > now:
+                delay = scheduler.paused_until - now
+                wait = delay if wait is None else min(wait, delay)
+                continue
+            remaining = scheduler.remaining
+            left = float("inf") if remaining is None else remaining - scheduler.reserve
+            score = (left, -self.in_flight[index])
+            if best_score is None or score > best_score:
+                best, best_score = index, score
+        return best, wait
+
+
+    def _acquire(self):
+        while True:
+            with self.lock:
+                index, wait = self._pick()
+                if index is not None:
+                    self.in_flight[index] += 1
+            if index is not None:
+                try:
+                    self.schedulers[index].acquire()
+                except QuotaExhausted:
+                    with self.lock:
+                        self.in_flight[index] -= 1
+                    continue
+                return index
+            if wait is not None:
+                time.sleep(min(wait, 60))
+                continue
+            if self.wait_for_reset and not all(self.rejected):
+                print("All API keys reached their daily quota, pausing until reset.")
+                time.sleep(seconds_until_reset())
+                for scheduler in self.schedulers:
+                    with scheduler.lock:
+                        scheduler.exhausted = False
+                        scheduler.remaining = None
+                continue
+            self.exhausted = True
+            raise QuotaExhausted("All API keys are out of quota or were rejected.")
+
+
+    def identify_post(self, **kwargs):
+        # The clients share one cache, so a hit is answered before any key takes quota for it.
+        if self.clients[0].cache is not None:
+            cached = self.clients[0].cached_identify(**kwargs)
+            if cached is not None:
+                self._local.client = self.clients[0]
+                return cached
+        attempt = 0
+        while True:
+            index = self._acquire()
+            client, scheduler = self.clients[index], self.schedulers[index]
+            try:
+                response = client.identify_post(**kwargs)
+            except requests.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                if status in REJECTED_STATUSES:
+                    self._reject(index, status)
+                    continue
+                # A 429 pauses only this key; the retry goes to whichever key is free.
+                if scheduler.backoff(e, attempt):
+                    attempt += 1
+                    continue
+                raise
+            finally:
+                with self.lock:
+                    self.in_flight[index] -= 1
+            scheduler.record(response)
+            self._local.client = client
+            return response
+
+
+    @property
+    def last_call_cached(self):
+        client = getattr(self._local, "client", None)
+        return client.last_call_cached if client is not None else False
+
+
+    def status(self):
+        keys = []
+        for client, scheduler, rejected in zip(self.clients, self.schedulers, self.rejected):
+            keys.append(dict(scheduler.status(), key=mask_key(client.api_key), rejected=rejected))
+        return {
+            "completed": sum(key["completed"] for key in keys),
+            "throughput": sum(key["throughput"] for key in keys),
+            "remaining": sum(key["remaining"] for key in keys) if all(key["remaining"] is not None
+                                                                      for key in keys) else None,
+            "exhausted": self.exhausted,
+            "keys": keys
+        }
+
+
+    def __getattr__(self, name):
+        # Delegates the other endpoints (species, projects, quota_daily, ...) to a working key.
+        clients = self.__dict__.get("clients")
+        if clients is None:
+            raise AttributeError(name)
+        for client, rejected in zip(clients, self.__dict__["rejected"]):
+            if not rejected:
+                return getattr(client, name)
+        return getattr(clients[0], name)
+
+
+    def close(self):
+        self.session.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def make_client(api_keys, **kwargs):
+    # A plain PlantNetEndpoints for one key, a KeyPool for several. The pool reads each key's
+    # remaining quota up front so that calls go to the key with the most left from the start.
+    keys = split_keys(api_keys)
+    if len(keys) == 1:
+        return PlantNetEndpoints(keys[0], **kwargs)
+    pool = KeyPool(keys, **kwargs)
+    pool.refresh()
+    return pool
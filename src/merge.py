@@ -0,0 +1,155 @@
+import os
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+try:
+    from .hashing import file_digest
+    from .scan import scan_images
+except ImportError:
+    from hashing import file_digest
+    from scan import scan_images
+
+pattern = re.compile(r'^(?P<base>[A-Za-z0-9]+_[A-Za-z0-9]+_[A-Za-z0-9]+)_(?P<number>\d+)_(?P<suffix>.+)$')
+
+FICLONE = 0x40049409
+
+
+class NameAllocator:
+    # Allocates unique file names in a destination folder from a single listing. Names of the form
+    # base_number_suffix get the first free number from their own number upwards, other names the
+    # first free _counter from 1, as get_unique_filename always did. Numbers found taken are linked
+    # to the next candidate, so repeated names skip runs of taken numbers instead of probing each.
+    def __init__(self, dest_dir):
+        self.taken = set(os.listdir(dest_dir)) if os.path.isdir(dest_dir) else set()
+        self.jumps = {}
+
+
+    def _first_free(self, key, start, make_name):
+        jumps = self.jumps.setdefault(key, {})
+        path = []
+        number = start
+        while True:
+            if number in jumps:
+                path.append(number)
+                number = jumps[number]
+            elif make_name(number) in self.taken:
+                path.append(number)
+                number += 1
+            else:
+                break
+        for visited in path:
+            jumps[visited] = number
+        return number
+
+
+    def allocate(self, filename):
+        name, ext = os.path.splitext(filename)
+        match = pattern.match(name)
+        if match:
+            base, suffix = match.group('base'), match.group('suffix')
+
+            def make_name(number):
+                return f"{base}_{number}_{suffix}{ext}"
+
+            if filename in self.taken:
+                new_filename = make_name(self._first_free(("numbered", base, suffix, ext),
+                                                          int(match.group('number')), make_name))
+            else:
+                new_filename = filename
+        else:
+            def make_name(number):
+                return f"{name}_{number}{ext}"
+
+            new_filename = make_name(self._first_free(("counter", name, ext), 1, make_name))
+        self.taken.add(new_filename)
+        return new_filename
+
+
+class ContentIndex:
+    # Detects images already present in the destination or earlier in the same merge. Files are
+    # only hashed once another file of the same size shows up, so most images are read once.
+    def __init__(self, dest_dir):
+        self.by_size = {}
+        self.digests = {}
+        self.hashed = set()
+        for path in scan_images(dest_dir, recursive=False):
+            self.by_size.setdefault(os.path.getsize(path), []).append((path, path))
+
+
+    def find(self, src_file):
+        size = os.path.getsize(src_file)
+        bucket = self.by_size.get(size)
+        if not bucket:
+            return None, size
+        for path, dest_file in bucket:
+            if path not in self.hashed:
+                self.digests.setdefault(file_digest(path), dest_file)
+                self.hashed.add(path)
+        return self.digests.get(file_digest(src_file)), size
+
+
+    def add(self, src_file, dest_file, size):
+        self.by_size.setdefault(size, []).append((src_file, dest_file))
+
+
+def link_or_copy(src_file, dest_file, link=None):
+    if link == "hard":
+        try:
+            os.link(src_file, dest_file)
+            return "linked"
+        except OSError:
+            pass
+    elif link == "reflink":
+        try:
+            import fcntl
+            with open(src_file, "rb") as src, open(dest_file, "wb") as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            shutil.copystat(src_file, dest_file)
+            return "cloned"
+        except (ImportError, OSError):
+            if os.path.exists(dest_file):
+                os.remove(dest_file)
+    shutil.copy2(src_file, dest_file)
+    return "copied"
+
+
+def get_unique_filename(dest_dir, filename):
+    return NameAllocator(dest_dir).allocate(filename)
+
+
+def merge_images(src_main_folders, dest_folder, workers=4, link=None, dedup=True):
+    if not os.path.exists(dest_folder):
+        os.makedirs(dest_folder)
+        print(f"Created destination folder: {dest_folder}")
+    allocator = NameAllocator(dest_folder)
+    index = ContentIndex(dest_folder) if dedup else None
+    plan = []
+    skipped = 0
+    for main_folder in src_main_folders:
+        if not os.path.exists(main_folder):
+            print(f"Main folder does not exist: {main_folder}")
+            continue
+        print(f"Processing main folder: {main_folder}")
+        with os.scandir(main_folder) as entries:
+            species_paths = [entry.path for entry in entries if entry.is_dir()]
+        for species_path in species_paths:
+            print(f"Found species folder: {species_path}")
+            # Process images directly in the species folder
+            for src_file in scan_images(species_path, recursive=False):
+                if index is not None:
+                    duplicate, size = index.find(src_file)
+                    if duplicate is not None:
+                        print(f"Skipped duplicate {src_file} (same as {duplicate})")
+                        skipped += 1
+                        continue
+                dest_file = os.path.join(dest_folder, allocator.allocate(os.path.basename(src_file)))
+                if index is not None:
+                    index.add(src_file, dest_file, size)
+                plan.append((src_file, dest_file))
+    # Names and duplicates are resolved above; only the file transfers run in parallel.
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        outcomes = list(executor.map(lambda step: link_or_copy(*step, link=link), plan))
+    print(f"Merged {len(plan)} images into {dest_folder} "
+          f"({outcomes.count('linked')} hard-linked, {outcomes.count('cloned')} cloned), "
+          f"skipped {skipped} duplicates.")
+    return plan
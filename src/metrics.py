@@ -0,0 +1,211 @@
+import json
+import os
+import sys
+import threading
+import time
+
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def endpoint_name(base_url, url):
+    # Collapses path parameters so calls for different projects share one series.
+    path = url[len(base_url):] if url.startswith(base_url) else url
+    parts = path.split("?", 1)[0].strip("/").split("/")
+    if parts[0] == "identify" and len(parts) == 2:
+        return "identify/{project}"
+    if parts[0] == "projects" and len(parts) == 3:
+        return "projects/{project}/species"
+    return "/".join(parts)
+
+
+def call_record(endpoint, method, response=None, error=None, elapsed=0.0, download=None, retries=0,
+                cache_hit=False):
+    # One finished endpoint call. elapsed covers all attempts and backoff pauses; wait is the last
+    # attempt's time until response headers (connect, upload and server time together, as
+    # requests does not split them) and download the time spent reading the body after that.
+    wait = response.elapsed.total_seconds() if response is not None else None
+    body = response.request.body if response is not None else None
+    return {
+        "time": time.time(),
+        "endpoint": endpoint,
+        "method": method,
+        "status": response.status_code if response is not None else None,
+        "elapsed": elapsed,
+        "wait": wait,
+        "download": max(0.0, download - wait) if download is not None and wait is not None else None,
+        "request_bytes": len(body) if isinstance(body, (bytes, str)) else 0,
+        "response_bytes": len(response.content) if response is not None else 0,
+        "retries": retries,
+        "cache_hit": cache_hit,
+        "error": type(error).__name__ if error is not None else None,
+    }
+
+
+class Histogram:
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+
+class MetricsCollector:
+    # Aggregates call records into counters and latency histograms per endpoint.
+    # Pass it as a hook: PlantNetEndpoints(..., hooks=[collector]).
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.errors = {}
+        self.retries = {}
+        self.cache_hits = {}
+        self.bytes_sent = {}
+        self.bytes_received = {}
+        self.histograms = {}
+
+
+    def __call__(self, record):
+        endpoint = record["endpoint"]
+        status = "cache" if record["cache_hit"] else str(record["status"] or "error")
+        with self.lock:
+            key = (endpoint, record["method"], status)
+            self.calls[key] = self.calls.get(key, 0) + 1
+            if record["error"] is not None:
+                key = (endpoint, record["error"])
+                self.errors[key] = self.errors.get(key, 0) + 1
+            self.retries[endpoint] = self.retries.get(endpoint, 0) + record["retries"]
+            if record["cache_hit"]:
+                self.cache_hits[endpoint] = self.cache_hits.get(endpoint, 0) + 1
+                return
+            self.bytes_sent[endpoint] = self.bytes_sent.get(endpoint, 0) + record["request_bytes"]
+            self.bytes_received[endpoint] = self.bytes_received.get(endpoint, 0) + record["response_bytes"]
+            for name in ("elapsed", "wait", "download"):
+                if record[name] is not None:
+                    key = (name, endpoint)
+                    if key not in self.histograms:
+                        self.histograms[key] = Histogram(self.buckets)
+                    self.histograms[key].observe(record[name])
+
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "calls": [{"endpoint": e, "method": m, "status": s, "count": c} for (e, m, s), c in self.calls.items()],
+                "errors": [{"endpoint": e, "error": err, "count": c} for (e, err), c in self.errors.items()],
+                "retries": dict(self.retries),
+                "cache_hits": dict(self.cache_hits),
+                "bytes_sent": dict(self.bytes_sent),
+                "bytes_received": dict(self.bytes_received),
+                "latency": {f"{name}:{endpoint}": {"count": h.count, "sum": h.sum,
+                                                    "buckets": dict(h.cumulative())}
+                            for (name, endpoint), h in self.histograms.items()},
+            }
+
+
+    def to_prometheus(self, prefix="plantnet"):
+        lines = []
+
+        def metric(name, kind, help_text):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+
+        with self.lock:
+            metric("requests_total", "counter", "Finished endpoint calls by HTTP status.")
+            for (endpoint, method, status), count in sorted(self.calls.items()):
+                lines.append(f'{prefix}_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} '
+                             f'{count}')
+            metric("request_errors_total", "counter", "Calls that raised instead of returning a response.")
+            for (endpoint, error), count in sorted(self.errors.items()):
+                lines.append(f'{prefix}_request_errors_total{{endpoint="{endpoint}",error="{error}"}} {count}')
+            for name, values, help_text in (
+                    ("request_retries_total", self.retries, "Retried attempts."),
+                    ("cache_hits_total", self.cache_hits, "Calls answered from the response cache."),
+                    ("request_bytes_total", self.bytes_sent, "Request body bytes sent."),
+                    ("response_bytes_total", self.bytes_received, "Response body bytes received.")):
+                metric(name, "counter", help_text)
+                for endpoint, value in sorted(values.items()):
+                    lines.append(f'{prefix}_{name}{{endpoint="{endpoint}"}} {value}')
+            for name, help_text in (("elapsed", "Call duration including retries."),
+                                    ("wait", "Time until response headers of the last attempt."),
+                                    ("download", "Time reading the response body.")):
+                metric(f"{name}_seconds", "histogram", help_text)
+                for (kind, endpoint), histogram in sorted(self.histograms.items()):
+                    if kind != name:
+                        continue
+                    for bound, count in histogram.cumulative():
+                        lines.append(f'{prefix}_{name}_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {count}')
+                    lines.append(f'{prefix}_{name}_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} '
+                                 f'{histogram.count}')
+                    lines.append(f'{prefix}_{name}_seconds_sum{{endpoint="{endpoint}"}} {histogram.sum}')
+                    lines.append(f'{prefix}_{name}_seconds_count{{endpoint="{endpoint}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+    def write_prometheus(self, path):
+        # Written to a temporary file and renamed, as the node_exporter textfile collector expects.
+        temp = path + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(temp, path)
+
+
+class PrometheusFileExporter:
+    # Rewrites the Prometheus text file every interval seconds while in use, and once more on exit.
+    def __init__(self, collector, path, interval=15.0):
+        self.collector = collector
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.collector.write_prometheus(self.path)
+
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+        self.collector.write_prometheus(self.path)
+
+
+class JsonLogExporter:
+    # Hook that writes every call record as one JSON line, to a file path or an open stream.
+    def __init__(self, target=None):
+        self.lock = threading.Lock()
+        self.owned = isinstance(target, str)
+        self.stream = open(target, "a", encoding="utf-8") if self.owned else (target or sys.stderr)
+
+
+    def __call__(self, record):
+        line = json.dumps(record)
+        with self.lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+    def close(self):
+        if self.owned:
+            self.stream.close()
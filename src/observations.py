@@ -0,0 +1,83 @@
+import math
+import os
+import re
+from datetime import datetime
+try:
+    from .exif import read_metadata
+except ImportError:
+    from exif import read_metadata
+
+MAX_IMAGES_PER_REQUEST = 5
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, "%Y:%m:%d %H:%M:%S")
+    except (TypeError, ValueError):
+        return None
+
+
+def distance_m(a, b):
+    lat1, lon1, lat2, lon2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371000 * math.asin(math.sqrt(h))
+
+
+def _chunks(images, size):
+    return [images[i:i + size] for i in range(0, len(images), size)]
+
+
+def group_by_time_location(images, max_gap=120, max_distance=50, max_images=MAX_IMAGES_PER_REQUEST):
+    dated = []
+    groups = []
+    for image in images:
+        try:
+            metadata = read_metadata(image)
+        except Exception:
+            metadata = {}
+        taken = _parse_date(metadata.get("date"))
+        location = None
+        if metadata.get("latitude") is not None and metadata.get("longitude") is not None:
+            location = (metadata["latitude"], metadata["longitude"])
+        if taken is None:
+            groups.append([image])
+        else:
+            dated.append((taken, location, image))
+    dated.sort(key=lambda entry: entry[0])
+    current = []
+    previous = None
+    for taken, location, image in dated:
+        if previous is not None:
+            prev_taken, prev_location = previous
+            too_late = (taken - prev_taken).total_seconds() > max_gap
+            too_far = (location is not None and prev_location is not None
+                       and distance_m(location, prev_location) > max_distance)
+            if too_late or too_far or len(current) >= max_images:
+                groups.append(current)
+                current = []
+        current.append(image)
+        previous = (taken, location)
+    if current:
+        groups.append(current)
+    return groups
+
+
+def group_by_folder(images, max_images=MAX_IMAGES_PER_REQUEST):
+    folders = {}
+    for image in images:
+        folders.setdefault(os.path.dirname(image), []).append(image)
+    return [chunk for folder in folders.values() for chunk in _chunks(folder, max_images)]
+
+
+def group_by_pattern(images, pattern, max_images=MAX_IMAGES_PER_REQUEST):
+    # The first capture group (or the named group "key") of the pattern identifies the observation.
+    regex = re.compile(pattern)
+    keys = {}
+    for image in images:
+        match = regex.search(os.path.basename(image))
+        if match is None:
+            key = image
+        else:
+            key = match.groupdict().get("key") or match.group(1 if regex.groups else 0)
+        keys.setdefault(key, []).append(image)
+    return [chunk for group in keys.values() for chunk in _chunks(group, max_images)]
@@ -0,0 +1,114 @@
+import queue
+import threading
+
+_DONE = object()
+
+
+class Pipeline:
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self.stages = []
+
+
+    def add_stage(self, func, workers=1):
+        self.stages.append((func, workers))
+        return self
+
+
+    def run(self, source, ordered=False):
+        # Every stage runs in its own worker threads and hands items to the next one through a
+        # bounded queue, so a slow stage blocks the ones before it instead of buffering input.
+        # Items come out in completion order, or in input order when ordered is set.
+        if ordered:
+            return _in_order(self._run(enumerate(source), [(_indexed(func), workers) for func, workers in self.stages]))
+        return self._run(source, self.stages)
+
+
+    def _run(self, source, stages):
+        queues = [queue.Queue(self.maxsize) for _ in range(len(stages) + 1)]
+        stop = threading.Event()
+        errors = []
+        threads = [threading.Thread(target=self._feed, args=(source, queues[0], stop, errors), daemon=True)]
+        for index, (func, workers) in enumerate(stages):
+            remaining = [workers, threading.Lock()]
+            for _ in range(workers):
+                threads.append(threading.Thread(
+                    target=self._work, args=(func, queues[index], queues[index + 1], remaining, stop, errors),
+                    daemon=True
+                ))
+        for thread in threads:
+            thread.start()
+        item = None
+        try:
+            while True:
+                item = queues[-1].get()
+                if item is _DONE:
+                    break
+                if not stop.is_set():
+                    yield item
+        finally:
+            stop.set()
+            while item is not _DONE:
+                item = queues[-1].get()
+            for thread in threads:
+                thread.join()
+        if errors:
+            raise errors[0]
+
+
+    @staticmethod
+    def _feed(source, outbox, stop, errors):
+        try:
+            for item in source:
+                if stop.is_set():
+                    break
+                outbox.put(item)
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            outbox.put(_DONE)
+
+
+    @staticmethod
+    def _work(func, inbox, outbox, remaining, stop, errors):
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                # Hand the marker on to sibling workers; the last one closes the next stage.
+                inbox.put(_DONE)
+                with remaining[1]:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last:
+                    outbox.put(_DONE)
+                return
+            if stop.is_set():
+                continue
+            try:
+                outbox.put(func(item))
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+
+
+def _indexed(func):
+    def run(entry):
+        index, item = entry
+        return index, func(item)
+    return run
+
+
+def _in_order(results):
+    # Results that finish before earlier ones are held until those are out. Every input yields a
+    # result, so the buffer only holds what overtook the slowest item still in flight.
+    pending = {}
+    expected = 0
+    try:
+        for index, result in results:
+            pending[index] = result
+            while expected in pending:
+                yield pending.pop(expected)
+                expected += 1
+    finally:
+        results.close()
@@ -0,0 +1,58 @@
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps
+
+
+def preprocess_image(path, max_side=1600, quality=85):
+    with Image.open(path) as img:
+        # Let the JPEG decoder downscale by a power of two while decoding.
+        img.draft("RGB", (max_side, max_side))
+        img = ImageOps.exif_transpose(img)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        img.thumbnail((max_side, max_side), Image.LANCZOS)
+        buffer = io.BytesIO()
+        # No exif/icc arguments are passed, so camera metadata is not carried over.
+        img.save(buffer, format="JPEG", quality=quality, optimize=True)
+    name = os.path.splitext(os.path.basename(path))[0] + ".jpg"
+    return name, buffer.getvalue()
+
+
+def _preprocess_item(item, max_side, quality):
+    if isinstance(item, list):
+        return [preprocess_image(path, max_side, quality) for path in item]
+    return preprocess_image(item, max_side, quality)
+
+
+class ImagePreprocessor:
+    def __init__(self, max_side=1600, quality=85, workers=None):
+        self.max_side = max_side
+        self.quality = quality
+        self.workers = workers or os.cpu_count() or 1
+
+
+    def __call__(self, path):
+        return preprocess_image(path, self.max_side, self.quality)
+
+
+    def map(self, paths):
+        # Bounded, order-preserving variant of Executor.map that pulls paths lazily.
+        # Failures are yielded in place of the payload so one bad file does not stop the batch.
+        max_in_flight = self.workers * 2
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            pending = deque()
+            for path in paths:
+                pending.append((path, executor.submit(_preprocess_item, path, self.max_side, self.quality)))
+                if len(pending) >= max_in_flight:
+                    yield _result(*pending.popleft())
+            while pending:
+                yield _result(*pending.popleft())
+
+
+def _result(path, future):
+    try:
+        return path, future.result()
+    except Exception as e:
+        return path, e
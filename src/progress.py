@@ -0,0 +1,34 @@
+import threading
+import time
+
+
+class Progress:
+    # Thread-safe counters for a running batch. Workers call update(); a display polls
+    # snapshot() on its own schedule. The total may be set later, e.g. by a background count.
+    def __init__(self, total=None):
+        self.lock = threading.Lock()
+        self.total = total
+        self.done = 0
+        self.errors = 0
+        self.started = time.monotonic()
+
+
+    def set_total(self, total):
+        with self.lock:
+            self.total = total
+
+
+    def update(self, count=1, errors=0):
+        with self.lock:
+            self.done += count
+            self.errors += errors
+
+
+    def snapshot(self):
+        with self.lock:
+            done, errors, total = self.done, self.errors, self.total
+        elapsed = time.monotonic() - self.started
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = (total - done) / rate if total is not None and rate > 0 else None
+        return {"done": done, "total": total, "errors": errors, "elapsed": elapsed,
+                "rate": rate, "eta": max(eta, 0.0) if eta is not None else None}
@@ -0,0 +1,133 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+import requests
+
+
+class QuotaExhausted(Exception):
+    pass
+
+
+def _find_number(data, words):
+    # The quota endpoints are loosely documented, so look for the first numeric value
+    # stored under a key containing one of the given words.
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if any(word in str(key).lower() for word in words) and isinstance(value, (int, float)):
+                return value
+        for value in data.values():
+            found = _find_number(value, words)
+            if found is not None:
+                return found
+    elif isinstance(data, list):
+        for value in data:
+            found = _find_number(value, words)
+            if found is not None:
+                return found
+    return None
+
+
+def retry_after_seconds(response):
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def seconds_until_reset():
+    now = datetime.now(timezone.utc)
+    tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (tomorrow - now).total_seconds()
+
+
+class QuotaScheduler:
+    def __init__(self, pne, daily_limit=None, reserve=0, wait_for_reset=False, max_backoff=300, max_retries=5):
+        self.pne = pne
+        self.daily_limit = daily_limit
+        self.reserve = reserve
+        self.wait_for_reset = wait_for_reset
+        self.max_backoff = max_backoff
+        self.max_retries = max_retries
+        self.remaining = None
+        self.exhausted = False
+        self.completed = 0
+        self.paused_until = 0.0
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+
+
+    def refresh(self):
+        if self.daily_limit is None:
+            subscription = self.pne.subscription()
+            if isinstance(subscription, dict):
+                self.daily_limit = _find_number(subscription, ("quota", "limit", "identif"))
+        used = _find_number(self.pne.quota_daily(datetime.now(timezone.utc).strftime("%Y-%m-%d")),
+                            ("identif", "count"))
+        with self.lock:
+            if self.daily_limit is not None and used is not None:
+                self.remaining = max(0, self.daily_limit - used)
+            self.exhausted = self.remaining is not None and self.remaining <= self.reserve
+        return self.remaining
+
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    delay = self.paused_until - now
+                elif self.remaining is not None and self.remaining <= self.reserve:
+                    if not self.wait_for_reset:
+                        self.exhausted = True
+                        raise QuotaExhausted(f"Daily quota reserve of {self.reserve} requests reached.")
+                    print("Daily quota reached, pausing until reset.")
+                    self.paused_until = now + seconds_until_reset()
+                    self.remaining = None
+                    continue
+                else:
+                    if self.remaining is not None:
+                        self.remaining -= 1
+                    return
+            time.sleep(min(delay, 60))
+
+
+    def record(self, response):
+        with self.lock:
+            self.completed += 1
+            reported = response.get("remainingIdentificationRequests") if isinstance(response, dict) else None
+            if isinstance(reported, (int, float)):
+                self.remaining = reported
+
+
+    def backoff(self, error, attempt):
+        # Returns True when the failed call should be retried after the pause set here.
+        if not isinstance(error, requests.HTTPError) or error.response is None:
+            return False
+        if error.response.status_code != 429 or attempt >= self.max_retries:
+            return False
+        delay = retry_after_seconds(error.response)
+        if delay is None:
+            delay = min(self.max_backoff, 2 ** attempt)
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        return True
+
+
+    def status(self):
+        with self.lock:
+            elapsed = time.monotonic() - self.started
+            return {
+                "completed": self.completed,
+                "throughput": self.completed / elapsed if elapsed > 0 else 0.0,
+                "remaining": self.remaining,
+                "paused_for": max(0.0, self.paused_until - time.monotonic()),
+                "exhausted": self.exhausted
+            }
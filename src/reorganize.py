@@ -0,0 +1,171 @@
+import csv
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+try:
+    from .scan import scan_images
+except ImportError:
+    from scan import scan_images
+
+UNDO_JOURNAL = "reorganize_undo.jsonl"
+
+
+def plan_rename_to_species(csv_file, directory, suffix=""):
+    plan = []
+    counters = {}
+    with open(csv_file, newline='', encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            original_file = row["Image File"]
+            species_name = row["Species Name"].replace(" ", "_")
+            predicted_organ = row["Predicted Organ"].replace(" ", "_")
+            key = f"{species_name}_{predicted_organ}"
+            counters[key] = counters.get(key, 0) + 1
+            new_file_name = f"{species_name}_{predicted_organ}_{counters[key]}"
+            if suffix:
+                new_file_name += f"_{suffix}"
+            file_ext = os.path.splitext(original_file)[1]
+            # Image names may be relative paths from a recursive run; files are renamed in their own folder.
+            plan.append((os.path.join(directory, original_file),
+                         os.path.join(directory, os.path.dirname(original_file), new_file_name + file_ext)))
+    return plan
+
+
+def plan_group_by_species(directory, recursive=False):
+    # With recursive set, renamed images in subfolders are gathered into the species folders too.
+    plan = []
+    for path in scan_images(directory, recursive=recursive):
+        filename = os.path.basename(path)
+        parts = filename.rsplit('_', 3)
+        if len(parts) < 4:
+            print(f"Skipping file with unexpected name format: {filename}")
+            continue
+        species_name = '_'.join(parts[:-3])  # Join all parts except the last three
+        plan.append((path, os.path.join(directory, species_name, filename)))
+    return plan
+
+
+def check_plan(plan):
+    # Splits a plan into runnable moves and conflicts, using one directory listing per
+    # target folder instead of an exists() call per file.
+    listings = {}
+
+    def exists(path):
+        folder, name = os.path.split(path)
+        if folder not in listings:
+            try:
+                listings[folder] = set(os.listdir(folder))
+            except FileNotFoundError:
+                listings[folder] = set()
+        return name in listings[folder]
+
+    moves = []
+    conflicts = []
+    targets = set()
+    for src, dst in plan:
+        if src == dst:
+            continue
+        if not exists(src):
+            conflicts.append((src, dst, "source does not exist"))
+        elif dst in targets:
+            conflicts.append((src, dst, "another file is planned to the same name"))
+        elif exists(dst):
+            conflicts.append((src, dst, "destination already exists"))
+        else:
+            targets.add(dst)
+            moves.append((src, dst))
+    return moves, conflicts
+
+
+def execute_plan(plan, journal_path=None, workers=1, dry_run=False):
+    moves, conflicts = check_plan(plan)
+    for src, dst, reason in conflicts:
+        print(f"Skipping {os.path.basename(src)}: {reason} ({dst})")
+    if dry_run:
+        for src, dst in moves:
+            print(f"Would move {src} to {dst}")
+        return moves, conflicts, []
+    created = sorted(folder for folder in {os.path.dirname(dst) for _, dst in moves} if not os.path.isdir(folder))
+    for folder in created:
+        os.makedirs(folder, exist_ok=True)
+    lock = threading.Lock()
+    failures = []
+    journal = open(journal_path, "a", encoding="utf-8") if journal_path else None
+    if journal is not None:
+        # Each run starts with a marker so that undo_plan reverts only the most recent run and
+        # removes the folders it created.
+        _append(journal, {"run": time.strftime("%Y-%m-%dT%H:%M:%S"), "moves": len(moves), "created": created})
+
+    def move(step):
+        src, dst = step
+        try:
+            os.rename(src, dst)
+        except OSError as e:
+            with lock:
+                failures.append((src, dst, str(e)))
+            return
+        if journal is not None:
+            # Written through before the next move, so a crash never loses a completed move.
+            with lock:
+                _append(journal, {"src": src, "dst": dst})
+
+    try:
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(move, moves))
+        else:
+            for step in moves:
+                move(step)
+    finally:
+        if journal is not None:
+            journal.close()
+    for src, dst, error in failures:
+        print(f"Error moving {os.path.basename(src)}: {error}")
+    print(f"Moved {len(moves) - len(failures)} files, {len(conflicts)} skipped, {len(failures)} failed.")
+    return moves, conflicts, failures
+
+
+def _append(journal, entry):
+    journal.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    journal.flush()
+    os.fsync(journal.fileno())
+
+
+def undo_plan(journal_path):
+    # Reverts the most recent run recorded in the journal. Once all of its moves are restored
+    # the run is cut from the journal, so calling undo_plan again steps back one more run.
+    with open(journal_path, encoding="utf-8") as f:
+        lines = [line for line in f if line.strip()]
+    entries = []
+    for line in lines:
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            # A partial last line left by a crash while the entry was written.
+            continue
+    start = max((i for i, entry in enumerate(entries) if "run" in entry), default=-1)
+    created = entries[start].get("created", []) if start >= 0 else []
+    steps = [entry for entry in entries[start + 1:] if "src" in entry]
+    undone = 0
+    for step in reversed(steps):
+        try:
+            os.rename(step["dst"], step["src"])
+            undone += 1
+        except OSError as e:
+            print(f"Error restoring {step['src']}: {e}")
+    if undone == len(steps):
+        for folder in reversed(created):
+            try:
+                os.rmdir(folder)
+            except OSError:
+                # Not empty: other files were put there since.
+                pass
+        earlier = entries[:max(start, 0)]
+        if earlier:
+            with open(journal_path, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(entry, ensure_ascii=False) + "\n" for entry in earlier)
+        else:
+            os.remove(journal_path)
+    print(f"Restored {undone} of {len(steps)} files.")
+    return undone
@@ -0,0 +1,135 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+def _id(value):
+    if isinstance(value, dict):
+        value = value.get("id")
+    return None if value is None else str(value)
+
+
+def _name(value):
+    if isinstance(value, dict):
+        return value.get("scientificNameWithoutAuthor")
+    return value
+
+
+class ResultStore:
+    def __init__(self, path="results.sqlite3", commit_every=200):
+        self.path = path
+        self.commit_every = commit_every
+        self._pending = 0
+        # Rows are added from whichever thread runs the batch, e.g. the GUI's worker thread.
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS images (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL,
+                file_name TEXT NOT NULL,
+                image_hash TEXT,
+                observation TEXT,
+                date TEXT,
+                latitude REAL,
+                longitude REAL,
+                altitude REAL,
+                predicted_organ TEXT,
+                organ_score REAL,
+                elapsed REAL,
+                cache_hit INTEGER,
+                error TEXT,
+                response TEXT,
+                created REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                image_id INTEGER NOT NULL REFERENCES images (id),
+                rank INTEGER NOT NULL,
+                species TEXT,
+                genus TEXT,
+                family TEXT,
+                score REAL,
+                gbif_id TEXT,
+                powo_id TEXT,
+                common_names TEXT
+            );
+            CREATE INDEX IF NOT EXISTS images_path ON images (path);
+            CREATE INDEX IF NOT EXISTS images_hash ON images (image_hash);
+            CREATE INDEX IF NOT EXISTS results_image ON results (image_id);
+            CREATE INDEX IF NOT EXISTS results_species ON results (species);
+        """)
+
+
+    def add(self, image, response=None, error=None, metadata=None, organ=None, elapsed=None, cache_hit=None,
+            image_hash=None, observation=None):
+        metadata = metadata or {}
+        organ = organ or {}
+        row = (os.path.abspath(image), os.path.basename(image), image_hash, observation, metadata.get("date"),
+               metadata.get("latitude"), metadata.get("longitude"), metadata.get("altitude"), organ.get("organ"),
+               organ.get("score"), elapsed, None if cache_hit is None else int(cache_hit),
+               None if error is None else str(error),
+               None if response is None else json.dumps(response, ensure_ascii=False), time.time())
+        results = []
+        if response is not None:
+            for rank, result in enumerate(response.get("results", []), start=1):
+                species = result.get("species", {})
+                results.append((rank, species.get("scientificNameWithoutAuthor"), _name(species.get("genus")),
+                                _name(species.get("family")), result.get("score"), _id(result.get("gbif")),
+                                _id(result.get("powo")),
+                                json.dumps(species.get("commonNames", []), ensure_ascii=False)))
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO images (path, file_name, image_hash, observation, date, latitude, longitude, "
+                "altitude, predicted_organ, organ_score, elapsed, cache_hit, error, response, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row
+            )
+            self.conn.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                  [(cursor.lastrowid,) + result for result in results])
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                self._commit()
+            return cursor.lastrowid
+
+
+    def _commit(self):
+        self.conn.commit()
+        self._pending = 0
+
+
+    def commit(self):
+        with self.lock:
+            self._commit()
+
+
+    def _query(self, sql, params):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+
+    def species_counts(self, min_score=0.0):
+        return self._query(
+            "SELECT species, COUNT(*), MAX(score) FROM results WHERE rank = 1 AND score >= ? "
+            "GROUP BY species ORDER BY COUNT(*) DESC", (min_score,)
+        )
+
+
+    def results_for(self, image):
+        return self._query(
+            "SELECT r.rank, r.species, r.score, r.gbif_id, r.powo_id FROM results r "
+            "JOIN images i ON i.id = r.image_id WHERE i.path = ? ORDER BY i.id DESC, r.rank",
+            (os.path.abspath(image),)
+        )
+
+
+    def find_by_hash(self, image_hash):
+        return self._query("SELECT id, path, response FROM images WHERE image_hash = ?", (image_hash,))
+
+
+    def close(self):
+        with self.lock:
+            self._commit()
+            self.conn.close()
@@ -0,0 +1,79 @@
+import random
+import threading
+import time
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts=4, backoff=0.5, max_backoff=30, retry_statuses=(500, 502, 503, 504),
+                 retry_methods=("GET", "POST")):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_statuses = frozenset(retry_statuses)
+        self.retry_methods = frozenset(method.upper() for method in retry_methods)
+
+
+    def should_retry(self, method, attempt):
+        return method.upper() in self.retry_methods and attempt + 1 < self.max_attempts
+
+
+    def delay(self, attempt):
+        # Full jitter keeps many workers from retrying in lockstep.
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_timeout=30, max_wait=None):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_wait = max_wait
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+
+    def before_call(self, probe):
+        # While the circuit is open callers wait instead of failing, and a single caller
+        # checks the service with probe() once the reset timeout has passed.
+        started = time.monotonic()
+        while True:
+            with self.lock:
+                if self.opened_at is None:
+                    return
+                now = time.monotonic()
+                if now - self.opened_at >= self.reset_timeout:
+                    try:
+                        probe()
+                    except Exception:
+                        self.opened_at = now
+                    else:
+                        self.opened_at = None
+                        self.failures = 0
+                        print("API is reachable again, resuming.")
+                        return
+                delay = self.opened_at + self.reset_timeout - time.monotonic()
+            if self.max_wait is not None and time.monotonic() - started + delay > self.max_wait:
+                raise CircuitOpen("API unavailable, circuit breaker is open.")
+            time.sleep(max(0.0, delay))
+
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.opened_at is None and self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                print(f"API failing after {self.failures} consecutive errors, pausing requests.")
@@ -0,0 +1,36 @@
+import os
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def scan_images(directory, recursive=True, extensions=IMAGE_EXTENSIONS, min_size=0, max_size=None):
+    # Depth-first walk with os.scandir, yielding matches as soon as they are listed so
+    # consumers can start working before a large directory has been read completely.
+    extensions = tuple(ext.lower() for ext in extensions)
+    check_size = min_size > 0 or max_size is not None
+    stack = [directory]
+    while stack:
+        path = stack.pop()
+        try:
+            entries = os.scandir(path)
+        except OSError as e:
+            print(f"Cannot scan {path}: {e}")
+            continue
+        subdirs = []
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            subdirs.append(entry.path)
+                        continue
+                    if not entry.name.lower().endswith(extensions) or not entry.is_file():
+                        continue
+                    if check_size:
+                        size = entry.stat().st_size
+                        if size < min_size or (max_size is not None and size > max_size):
+                            continue
+                except OSError:
+                    continue
+                yield entry.path
+        stack.extend(reversed(subdirs))
@@ -1,18 +1,37 @@
-import shutil
 import csv
+import itertools
 import sys
-import time
 import os
-import tkinter as tk
-from tkinter import filedialog
-from PIL import Image, ExifTags
+import threading
+import time
+try:
+    from .aggregate import aggregate_files, extra_columns, EXTRA_FIELDS
+    from .batch import make_identifier, until_exhausted
+    from .dedup import Deduplicator
+    from .exif import read_metadata
+    from .hashing import file_digest
+    from .journal import Journal
+    from .keypool import KeyPool
+    from .pipeline import Pipeline
+    from .quota import QuotaExhausted
+    from .reorganize import UNDO_JOURNAL, execute_plan, plan_group_by_species, plan_rename_to_species
+    from .scan import scan_images
+except ImportError:
+    from aggregate import aggregate_files, extra_columns, EXTRA_FIELDS
+    from batch import make_identifier, until_exhausted
+    from dedup import Deduplicator
+    from exif import read_metadata
+    from hashing import file_digest
+    from journal import Journal
+    from keypool import KeyPool
+    from pipeline import Pipeline
+    from quota import QuotaExhausted
+    from reorganize import UNDO_JOURNAL, execute_plan, plan_group_by_species, plan_rename_to_species
+    from scan import scan_images
 
 
 def image_paths(directory):
-    return [os.path.join(directory, f)
-            for f in os.listdir(directory)
-            if os.path.isfile(os.path.join(directory, f))
-            and f.lower().endswith(('.jpg', '.jpeg', '.png'))]
+    return list(scan_images(directory, recursive=False))
 
 
 def extract_data(response_data):
@@ -46,122 +65,242 @@ def image_date_location(image_path):
         print(f"File not found: {image_path}")
         return "N/A", "N/A", "N/A"
     try:
-        with Image.open(image_path) as img:
-            exif_data = img._getexif()
-            if not exif_data:
-                return "N/A", "N/A", "N/A"
-            exif = {ExifTags.TAGS.get(tag, tag): value for tag, value in exif_data.items()}
-            date_time = exif.get("DateTimeOriginal", "N/A")
-            gps_info = exif.get("GPSInfo", None)
-            location = "N/A"
-            altitude = "N/A"
-            if gps_info:
-                def convert_value_to_dms(value):
-                    d = float(value[0])
-                    m = float(value[1])
-                    s = float(value[2])
-                    return f"{int(d)}:{int(m)}:{repr(s)}"
-
-                lat_dms = None
-                lon_dms = None
-                if 2 in gps_info and 1 in gps_info:
-                    lat_dms = convert_value_to_dms(gps_info[2])
-                    if gps_info[1] == "S":
-                        lat_dms = f"-{lat_dms}"
-                if 4 in gps_info and 3 in gps_info:
-                    lon_dms = convert_value_to_dms(gps_info[4])
-                    if gps_info[3] == "W":
-                        lon_dms = f"-{lon_dms}"
-                if 6 in gps_info:
-                    altitude_value = float(gps_info[6])
-                    altitude = f"{altitude_value}"
-                if lat_dms and lon_dms:
-                    location = f"{lat_dms}, {lon_dms}"
-            return date_time, location, altitude
+        metadata = read_metadata(image_path)
     except Exception as e:
         print(f"Exception occurred: {e}")
         return None, None, None
+    return date_location(metadata)
+
 
+def date_location(metadata):
+    date_time = metadata["date"] or "N/A"
+    location = metadata["location"] or "N/A"
+    altitude = "N/A" if metadata["altitude"] is None else f"{metadata['altitude']}"
+    return date_time, location, altitude
 
-def identify_images_api(pne):
+
+def identify_images_api(pne, workers=4, rate=None, preprocessor=None, group=None, resume=False, scheduler=None,
+                        store=None, dedup=False, progress=None):
+    import tkinter as tk
+    from tkinter import filedialog
     root = tk.Tk()
     root.withdraw()
     directory = filedialog.askdirectory(title="Select Image Directory")
     if not directory:
         print("No directory selected.")
         sys.exit(1)
-    image_files = image_paths(directory)
-    if not image_files:
+    image_files = scan_images(directory, recursive=False)
+    first = next(image_files, None)
+    if first is None:
         print("No image files found in directory.")
         sys.exit(1)
+    image_files = itertools.chain([first], image_files)
+    if progress is not None:
+        count_images(progress, directory)
     output_file = os.path.join(directory, "results.csv")
-    with open(output_file, mode="w", newline="", encoding="utf-8") as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(["Image File", "Genus", "Family", "Species Name", "Common Names",
-                         "Predicted Organ", "Predicted Organ Score", "Species Score", "Date", "Location", "Altitude"])
-        for image in image_files:
-            print(f"Processing: {image}")
+    identify_images(pne, image_files, output_file, workers=workers, rate=rate, preprocessor=preprocessor,
+                    group=group, resume=resume, scheduler=scheduler, store=store, dedup=dedup, progress=progress)
+
+
+def count_images(progress, directory, recursive=False):
+    # Counting is cheap next to the uploads and runs alongside them, so the scan still streams.
+    def count():
+        progress.set_total(sum(1 for _ in scan_images(directory, recursive=recursive)))
+    threading.Thread(target=count, daemon=True).start()
+
+
+def split_response(response, count):
+    # predictedOrgans holds one entry per uploaded image, in upload order.
+    organs = response.get("predictedOrgans", [])
+    if count == 1 or len(organs) != count:
+        return [response] * count
+    return [dict(response, predictedOrgans=[organ]) for organ in organs]
+
+
+def result_row(image, response, error=None, metadata=None, root=None):
+    try:
+        if error is not None:
+            raise error
+        predicted_organ, predicted_organ_score, sci_name, species_score, genus, family, common_names = extract_data(
+            response)
+        date_time, location, altitude = metadata if metadata is not None else image_date_location(image)
+    except Exception as e:
+        error_message = f"Error: {e}"
+        predicted_organ = predicted_organ_score = sci_name = species_score = genus = family = common_names = error_message
+        date_time, location, altitude = "N/A", "N/A", "N/A"
+    return [image_name(image, root), genus, family, sci_name, common_names, predicted_organ,
+            predicted_organ_score, species_score, date_time, location, altitude]
+
+
+def image_name(image, root=None):
+    # Images found in subfolders are recorded relative to the scanned directory so that rename_to_species finds them.
+    return os.path.relpath(image, root) if root is not None else os.path.basename(image)
+
+
+def store_results(store, item, images, error, responses, metadata, hashes, timing):
+    observation = hashes[0] if isinstance(item, list) else None
+    for image, response, image_metadata, image_hash in zip(images, responses, metadata, hashes):
+        organs = response.get("predictedOrgans", []) if response is not None else []
+        store.add(image, response=response, error=error, metadata=image_metadata,
+                  organ=organs[0] if len(organs) == 1 else None, elapsed=timing["elapsed"],
+                  cache_hit=timing["cache_hit"], image_hash=image_hash, observation=observation)
+
+
+def skip_completed(image_files, journal, write_row):
+    for image in image_files:
+        row = journal.completed(image)
+        if row is not None:
+            write_row(row)
+        else:
+            yield image
+
+
+def identify_images(pne, image_files, output_file, workers=4, rate=None, preprocessor=None, group=None,
+                    resume=False, scheduler=None, prepare_workers=None, store=None, dedup=False, progress=None,
+                    root=None):
+    # Images flow through a staged pipeline: EXIF reading and optional preprocessing, upload,
+    # response parsing and CSV writing each run concurrently with bounded queues in between.
+    # In resume mode every successful row is journaled next to the CSV, and on restart images
+    # that are already journaled and unchanged on disk are written back without an API call.
+    journal = Journal(output_file + ".journal") if resume else None
+    identify = make_identifier(pne, rate=rate, scheduler=scheduler)
+    # A key pool schedules quota per key itself and reports like a scheduler.
+    quota = scheduler if scheduler is not None or not isinstance(pne, KeyPool) else pne
+    if prepare_workers is None:
+        prepare_workers = preprocessor.workers if preprocessor is not None else 2
+    lock = threading.Lock()
+    deduplicator = (dedup if isinstance(dedup, Deduplicator) else Deduplicator()) if dedup else None
+
+    def count(images, error=None):
+        if progress is not None:
+            progress.update(images, images if error is not None else 0)
+
+    def read(image):
+        try:
+            return read_metadata(image)
+        except Exception as e:
+            print(f"Exception occurred: {e}")
+            return None
+
+    def digest(image):
+        if store is None:
+            return None
+        if deduplicator is not None:
+            return deduplicator.digest(image)
+        try:
+            return file_digest(image)
+        except OSError:
+            return None
+
+    def prepare(item):
+        images = item if isinstance(item, list) else [item]
+        metadata = [read(image) for image in images]
+        hashes = [digest(image) for image in images]
+        payload = item
+        if preprocessor is not None:
             try:
-                response = pne.identify_post(images=[image])
-                predicted_organ, predicted_organ_score, sci_name, species_score, genus, family, common_names = extract_data(
-                    response)
-                date_time, location, altitude = image_date_location(image)
+                payload = [preprocessor(image) for image in item] if isinstance(item, list) else preprocessor(item)
             except Exception as e:
-                error_message = f"Error: {e}"
-                predicted_organ = predicted_organ_score = sci_name = species_score = genus = family = common_names = error_message
-                date_time, location, altitude = "N/A", "N/A", "N/A"
-            writer.writerow([os.path.basename(image), genus, family, sci_name, common_names, predicted_organ,
-                             predicted_organ_score, species_score, date_time, location, altitude])
+                payload = e
+        return item, payload, metadata, hashes
+
+    def upload(prepared):
+        item, payload, metadata, hashes = prepared
+        started = time.perf_counter()
+        response, error = identify(payload)
+        timing = {"elapsed": time.perf_counter() - started, "cache_hit": getattr(pne, "last_call_cached", False)}
+        return item, metadata, hashes, response, error, timing
+
+    def parse(uploaded):
+        item, metadata, hashes, response, error, timing = uploaded
+        images = item if isinstance(item, list) else [item]
+        responses = split_response(response, len(images)) if response is not None else [None] * len(images)
+        rows = [result_row(image, image_response, error,
+                           date_location(image_metadata) if image_metadata is not None else (None, None, None), root)
+                for image, image_response, image_metadata in zip(images, responses, metadata)]
+        return item, images, rows, error, (responses, metadata, hashes, timing)
+
+    with open(output_file, mode="w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.writer(csvfile)
 
-            time.sleep(1)
+        def write_row(row):
+            with lock:
+                writer.writerow(row)
+
+        write_row(["Image File", "Genus", "Family", "Species Name", "Common Names",
+                   "Predicted Organ", "Predicted Organ Score", "Species Score", "Date", "Location", "Altitude"])
+
+        def write_completed(row):
+            write_row(row)
+            count(1)
+
+        def fan_out(duplicate, row, error, details, index):
+            # Copies of the same file get the original's result under their own name.
+            row = [image_name(duplicate, root)] + row[1:]
+            write_row(row)
+            count(1, error)
+            if journal is not None and error is None:
+                journal.record(duplicate, row)
+            if store is not None:
+                responses, metadata, hashes, timing = details
+                store_results(store, duplicate, [duplicate], error, [responses[index]], [metadata[index]],
+                              [hashes[index]], timing)
+
+        if journal is not None:
+            image_files = skip_completed(image_files, journal, write_completed)
+        if deduplicator is not None:
+            image_files = deduplicator.filter(image_files)
+        if group is not None:
+            image_files = group(list(image_files))
+        pipeline = Pipeline(maxsize=workers * 4)
+        pipeline.add_stage(prepare, workers=prepare_workers)
+        pipeline.add_stage(upload, workers=workers)
+        pipeline.add_stage(parse)
+        left_out = 0
+        # Rows keep the input order, so rename_to_species numbers files the same way on every run.
+        for item, images, rows, error, details in pipeline.run(until_exhausted(image_files, quota, pne), ordered=True):
+            if isinstance(error, QuotaExhausted):
+                # Left out of the CSV so that a resumed run picks these images up again.
+                left_out += len(images)
+                continue
+            print(f"Processed: {item}")
+            count(len(images), error)
+            for image, row in zip(images, rows):
+                write_row(row)
+                if journal is not None and error is None:
+                    journal.record(image, row)
+            if store is not None:
+                store_results(store, item, images, error, *details)
+            if deduplicator is not None:
+                for index, (image, row) in enumerate(zip(images, rows)):
+                    for duplicate in deduplicator.finish(image, (row, error, details, index)):
+                        fan_out(duplicate, row, error, details, index)
+        if deduplicator is not None:
+            for duplicate, result in deduplicator.leftovers():
+                fan_out(duplicate, *result)
+            deduplicator.report()
+    if journal is not None:
+        journal.close()
+    if store is not None:
+        store.commit()
+    if quota is not None:
+        status = quota.status()
+        print(f"Throughput: {status['throughput']:.2f} images/s, remaining quota: {status['remaining']}")
+        # Without a cache the rest of the input is not read once the quota is gone; with one, only
+        # images that missed the cache are left out.
+        if status["exhausted"] and (left_out or getattr(pne, "cache", None) is None):
+            print("Stopped early because the daily quota was reached; rerun with resume=True to continue.")
     print(f"Results have been saved to {output_file}")
 
 
-def rename_to_species(csv_file, directory, suffix: str = ""):
-    counters = {}
-    with open(csv_file, newline='', encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            original_file = row["Image File"]
-            species_name = row["Species Name"].replace(" ", "_")
-            predicted_organ = row["Predicted Organ"].replace(" ", "_")
-            key = f"{species_name}_{predicted_organ}"
-            counters[key] = counters.get(key, 0) + 1
-            new_file_name = f"{species_name}_{predicted_organ}_{counters[key]}"
-            if suffix:
-                new_file_name += f"_{suffix}"
-            file_ext = os.path.splitext(original_file)[1]
-            original_path = os.path.join(directory, original_file)
-            new_path = os.path.join(directory, new_file_name + file_ext)
-            try:
-                os.rename(original_path, new_path)
-                print(f"Renamed {original_file} to {new_file_name + file_ext}")
-            except Exception as e:
-                print(f"Error renaming {original_file}: {e}")
-
-
-def group_by_species(directory):
-    image_extensions = ('.jpg', '.jpeg', '.png')
-    for filename in os.listdir(directory):
-        if not os.path.isfile(os.path.join(directory, filename)):
-            continue
-        if not filename.lower().endswith(image_extensions):
-            continue
-        parts = filename.rsplit('_', 3)
-        if len(parts) < 4:
-            print(f"Skipping file with unexpected name format: {filename}")
-            continue
-        species_name = '_'.join(parts[:-3])  # Join all parts except the last three
-        species_folder = os.path.join(directory, species_name)
-        if not os.path.exists(species_folder):
-            os.makedirs(species_folder)
-        src_path = os.path.join(directory, filename)
-        dest_path = os.path.join(species_folder, filename)
-        try:
-            shutil.move(src_path, dest_path)
-            print(f"Moved {filename} to {species_name}")
-        except Exception as e:
-            print(f"Error moving {filename}: {e}")
+def rename_to_species(csv_file, directory, suffix: str = "", dry_run=False, workers=1):
+    plan = plan_rename_to_species(csv_file, directory, suffix)
+    return execute_plan(plan, journal_path=os.path.join(directory, UNDO_JOURNAL), workers=workers, dry_run=dry_run)
+
+
+def group_by_species(directory, dry_run=False, workers=1, recursive=False):
+    plan = plan_group_by_species(directory, recursive=recursive)
+    return execute_plan(plan, journal_path=os.path.join(directory, UNDO_JOURNAL), workers=workers, dry_run=dry_run)
 
 
 def get_first_english_common_name(common_names_str):
@@ -169,37 +308,22 @@ def get_first_english_common_name(common_names_str):
         return ""
     for name in common_names_str.split(','):
         candidate = name.strip()
-        try:
-            candidate.encode('ascii')
+        if candidate.isascii():
             return candidate
-        except UnicodeEncodeError:
-            continue
     return common_names_str.split(',')[0].strip()
 
 
-def refactor_results(input_file):
-    base, ext = os.path.splitext(input_file)
-    output_file = base + "_refactored" + ext
-    species_dict = {}
-    with open(input_file, 'r', newline='', encoding='utf-8') as infile:
-        reader = csv.DictReader(infile)
-        for row in reader:
-            species_name = row['Species Name']
-            predicted_organ = row['Predicted Organ'].strip().lower()
-            if species_name not in species_dict:
-                species_dict[species_name] = {
-                    'Genus': row['Genus'],
-                    'Family': row['Family'],
-                    'Common Names': get_first_english_common_name(row['Common Names']),
-                    'Date': row['Date'],
-                    'Location': row['Location'],
-                    'Altitude': row['Altitude'],
-                    'organs': set()
-                }
-            species_dict[species_name]['organs'].add(predicted_organ)
+def refactor_results(input_file, output_file=None, workers=None, extra=False):
+    input_files = [input_file] if isinstance(input_file, str) else list(input_file)
+    if output_file is None:
+        base, ext = os.path.splitext(input_files[0])
+        output_file = base + "_refactored" + ext
+    species_dict = aggregate_files(input_files, workers=workers)
     all_organs = sorted({organ for sp in species_dict.values() for organ in sp['organs']})
     fieldnames = ['Genus', 'Family', 'Species Name', 'Common Names', "Turkish Name", "Type", "Clade"] + all_organs + [
         'Date', 'Location', 'Altitude']
+    if extra:
+        fieldnames += EXTRA_FIELDS
     with open(output_file, 'w', newline='', encoding='utf-8') as outfile:
         writer = csv.DictWriter(outfile, fieldnames=fieldnames)
         writer.writeheader()
@@ -208,12 +332,14 @@ def refactor_results(input_file):
                 'Genus': data['Genus'],
                 'Family': data['Family'],
                 'Species Name': species_name,
-                'Common Names': data['Common Names'],
+                'Common Names': get_first_english_common_name(data['Common Names']),
                 'Date': data['Date'],
                 'Location': data['Location'],
                 'Altitude': data['Altitude']
             }
             for organ in all_organs:
                 row_dict[organ] = '+' if organ in data['organs'] else ''
+            if extra:
+                row_dict.update(extra_columns(data))
             writer.writerow(row_dict)
     print(f"Output saved at: {os.path.abspath(output_file)}")
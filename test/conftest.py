@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "bench"))
+
+import mock_server
+from corpus import generate_corpus
+
+
+@pytest.fixture
+def mock_api():
+    # Starts the local stand-in for the v2 API from bench/; returns a function taking MockState options.
+    servers = []
+
+    def start(**options):
+        options.setdefault("latency", 0.0)
+        options.setdefault("jitter", 0.0)
+        server, base_url = mock_server.start(**options)
+        servers.append(server)
+        return base_url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def images(tmp_path):
+    return generate_corpus(str(tmp_path / "images"), count=8, width=64, height=48)
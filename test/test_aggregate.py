@@ -0,0 +1,48 @@
+import csv
+
+from aggregate import aggregate_file, aggregate_files, merge_partials
+
+FIELDS = ["Species Name", "Genus", "Family", "Common Names", "Predicted Organ", "Species Score", "Date",
+          "Location", "Altitude"]
+
+
+def write_results(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        for species, organ, score, date, location in rows:
+            writer.writerow({"Species Name": species, "Genus": species.split()[0], "Family": "Fagaceae",
+                             "Common Names": "", "Predicted Organ": organ, "Species Score": score,
+                             "Date": date, "Location": location, "Altitude": "N/A"})
+    return str(path)
+
+
+def test_merge_partials_combines_species(tmp_path):
+    first = write_results(tmp_path / "a.csv", [
+        ("Quercus robur", "leaf", "0.4", "2024:05:02 10:00:00", "41:0:0.0, 29:0:0.0"),
+        ("Fagus sylvatica", "bark", "0.3", "N/A", "N/A"),
+    ])
+    second = write_results(tmp_path / "b.csv", [
+        ("Quercus robur", "Flower ", "0.7", "2024:05:01 09:00:00", "-1:30:0.0, 30:0:0.0"),
+        ("Abies alba", "leaf", "N/A", "N/A", "N/A"),
+    ])
+    species = merge_partials(aggregate_file(first, 0), aggregate_file(second, 1))
+    oak = species["Quercus robur"]
+    assert oak["count"] == 2
+    assert oak["organs"] == {"leaf", "flower"}
+    assert oak["max_score"] == 0.7
+    assert (oak["first_date"], oak["last_date"]) == ("2024:05:01 09:00:00", "2024:05:02 10:00:00")
+    assert oak["box"] == (-1.5, 29.0, 41.0, 30.0)
+    assert species["Abies alba"]["max_score"] is None
+    assert species["Abies alba"]["box"] is None
+
+
+def test_merge_keeps_first_seen_order(tmp_path):
+    first = write_results(tmp_path / "a.csv", [("Pinus nigra", "leaf", "0.5", "N/A", "N/A")])
+    second = write_results(tmp_path / "b.csv", [("Abies alba", "leaf", "0.5", "N/A", "N/A"),
+                                                ("Pinus nigra", "bark", "0.9", "N/A", "N/A")])
+    # Partials may arrive in any order; the entry seen first keeps its position.
+    species = merge_partials(aggregate_file(second, 1), aggregate_file(first, 0))
+    assert species["Pinus nigra"]["order"] == (0, 0)
+    assert species["Pinus nigra"]["organs"] == {"leaf", "bark"}
+    assert list(aggregate_files([first, second], workers=2)) == ["Pinus nigra", "Abies alba"]
@@ -0,0 +1,46 @@
+import asyncio
+import threading
+
+import async_endpoints
+from async_endpoints import AsyncPlantNetEndpoints
+
+
+def test_identify_and_metadata(mock_api, images):
+    async def run():
+        async with AsyncPlantNetEndpoints("key", base_url=mock_api(daily_quota=50), concurrency=4) as pne:
+            results = await asyncio.gather(*(pne.identify_post(images=[image]) for image in images))
+            return results, await pne.languages(), await pne.species(pageSize=2, page=1)
+
+    results, languages, species = asyncio.run(run())
+    assert [result["bestMatch"] for result in results] == ["Quercus robur"] * len(images)
+    assert min(result["remainingIdentificationRequests"] for result in results) == 50 - len(images)
+    assert languages == ["en", "fr", "tr"]
+    assert len(species) == 2
+
+
+def test_files_are_read_only_inside_the_concurrency_limit(mock_api, images, monkeypatch):
+    lock = threading.Lock()
+    counts = {"read": 0, "done": 0, "ahead": 0}
+    read_file = async_endpoints._read_file
+
+    def counting_read(path):
+        with lock:
+            counts["read"] += 1
+            counts["ahead"] = max(counts["ahead"], counts["read"] - counts["done"])
+        return read_file(path)
+
+    monkeypatch.setattr(async_endpoints, "_read_file", counting_read)
+
+    async def run():
+        async with AsyncPlantNetEndpoints("key", base_url=mock_api(latency=0.01), concurrency=2) as pne:
+            async def identify(image):
+                result = await pne.identify_post(images=[image])
+                with lock:
+                    counts["done"] += 1
+                return result
+
+            await asyncio.gather(*(identify(image) for image in images * 5))
+
+    asyncio.run(run())
+    assert counts["read"] == len(images) * 5
+    assert counts["ahead"] <= 2
@@ -0,0 +1,68 @@
+import random
+import threading
+import time
+
+from batch import identify_batch
+from endpoints import PlantNetEndpoints
+
+
+class SlowEndpoints:
+    # Answers in a random order so that ordering comes from identify_batch, not from the calls.
+    def __init__(self, seed=0):
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def identify_post(self, images=None, **kwargs):
+        with self.lock:
+            delay = self.random.uniform(0, 0.02)
+        time.sleep(delay)
+        if images[0] == "broken":
+            raise ValueError("broken image")
+        return {"bestMatch": images[0]}
+
+
+def test_ordered_results_follow_input():
+    names = [f"image_{i}" for i in range(40)]
+    results = list(identify_batch(SlowEndpoints(), names, workers=8))
+    assert [image for image, _, _ in results] == names
+    assert all(response == {"bestMatch": image} for image, response, _ in results)
+
+
+def test_unordered_results_cover_input():
+    names = [f"image_{i}" for i in range(40)]
+    results = list(identify_batch(SlowEndpoints(), names, workers=8, ordered=False))
+    assert sorted(image for image, _, _ in results) == sorted(names)
+
+
+def test_errors_are_returned_in_place():
+    names = ["a", "broken", "b"]
+    results = list(identify_batch(SlowEndpoints(), names, workers=2))
+    assert [image for image, _, _ in results] == names
+    image, response, error = results[1]
+    assert response is None and isinstance(error, ValueError)
+
+
+def test_inputs_are_pulled_lazily():
+    pulled = []
+
+    def source():
+        for i in range(100):
+            pulled.append(i)
+            yield f"image_{i}"
+
+    results = identify_batch(SlowEndpoints(), source(), workers=2)
+    next(results)
+    results.close()
+    assert len(pulled) <= 2 * 2 + 1
+
+
+def test_identify_against_mock(mock_api, images):
+    base_url = mock_api(daily_quota=100)
+    with PlantNetEndpoints("key", base_url=base_url) as pne:
+        results = list(identify_batch(pne, images, workers=4))
+    assert [image for image, _, _ in results] == images
+    for image, response, error in results:
+        assert error is None
+        assert response["bestMatch"] == "Quercus robur"
+    # Calls finish in any order, so the lowest count reported is the one after the last call.
+    assert min(response["remainingIdentificationRequests"] for _, response, _ in results) == 100 - len(images)
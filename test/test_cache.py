@@ -0,0 +1,52 @@
+import shutil
+import time
+
+import requests
+
+from cache import ResponseCache
+from endpoints import PlantNetEndpoints
+
+
+def test_key_depends_on_contents_and_parameters():
+    key = ResponseCache.make_key(["abc"], {"lang": "en", "project": "all"})
+    assert key == ResponseCache.make_key(["abc"], {"project": "all", "lang": "en"})
+    assert key != ResponseCache.make_key(["abc"], {"lang": "fr", "project": "all"})
+    assert key != ResponseCache.make_key(["abd"], {"lang": "en", "project": "all"})
+
+
+def test_expired_entries_are_dropped(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), ttl=0.05)
+    cache.set("key", {"bestMatch": "Abies alba", "remainingIdentificationRequests": 3})
+    # The remaining quota belongs to the live response only.
+    assert cache.get("key") == {"bestMatch": "Abies alba"}
+    time.sleep(0.1)
+    assert cache.get("key") is None
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), max_entries=2, evict_every=1)
+    cache.set("a", 1)
+    time.sleep(0.01)
+    cache.set("b", 2)
+    time.sleep(0.01)
+    cache.get("a")
+    time.sleep(0.01)
+    cache.set("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    cache.close()
+
+
+def test_identical_files_share_an_entry(mock_api, tmp_path, images):
+    base_url = mock_api()
+    copy = str(tmp_path / "copy.jpg")
+    shutil.copyfile(images[0], copy)
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"))
+    with PlantNetEndpoints("key", base_url=base_url, cache=cache) as pne:
+        first = pne.identify_post(images=[images[0]])
+        assert not pne.last_call_cached
+        assert pne.identify_post(images=[copy])["results"] == first["results"]
+        assert pne.last_call_cached
+        pne.identify_post(images=[copy], lang="fr")
+        assert not pne.last_call_cached
+    assert requests.get(base_url + "_stats").json()["identify"] == 2
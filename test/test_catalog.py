@@ -0,0 +1,18 @@
+from catalog import SpeciesCatalog
+from endpoints import PlantNetEndpoints
+
+
+def test_lookup_and_families(mock_api, images, tmp_path):
+    catalog = SpeciesCatalog(str(tmp_path / "catalog.sqlite3"))
+    with PlantNetEndpoints("key", base_url=mock_api()) as pne:
+        assert catalog.download(pne, page_size=2) == 5
+        assert catalog.lookup("quercus robur")["gbifId"] == 1000
+        assert [item["scientificNameWithoutAuthor"] for item in catalog.by_genus("Pinus")] == ["Pinus nigra"]
+        assert catalog.by_family("Pinaceae") == []
+        assert catalog.add_families(pne.identify_post(images=images[:1])) == 5
+        names = [item["scientificNameWithoutAuthor"] for item in catalog.by_family("Pinaceae")]
+        assert names == ["Abies alba", "Pinus nigra"]
+        # Families are kept per genus, so a fresh download does not lose them.
+        catalog.download(pne)
+        assert len(catalog.by_family("Fagaceae")) == 2
+    catalog.close()
@@ -0,0 +1,36 @@
+import csv
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+from corpus import generate_corpus
+
+import cli
+
+
+def test_recursive_identify_rename_and_group(mock_api, tmp_path):
+    directory = str(tmp_path / "images")
+    # The same file names in two subfolders.
+    generate_corpus(os.path.join(directory, "a"), count=2, width=32, height=32)
+    generate_corpus(os.path.join(directory, "b"), count=2, width=32, height=32)
+    result = subprocess.run([sys.executable, "-m", "src.cli", "--quiet", "identify", directory, "-r", "--api-key",
+                             "key", "--base-url", mock_api(), "--progress", "none"],
+                            cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == cli.EXIT_OK, result.stderr
+    results = os.path.join(directory, "results.csv")
+    with open(results, newline="", encoding="utf-8") as f:
+        names = sorted(row["Image File"] for row in csv.DictReader(f))
+    assert names == [os.path.join(folder, f"IMG_0000{i}.jpg") for folder in "ab" for i in range(2)]
+
+    assert cli.main(["rename", results, directory, "FK"]) == cli.EXIT_OK
+    renamed = os.listdir(os.path.join(directory, "a")) + os.listdir(os.path.join(directory, "b"))
+    assert sorted(renamed) == [f"Quercus_robur_leaf_{i}_FK.jpg" for i in range(1, 5)]
+
+    assert cli.main(["group", directory, "-r"]) == cli.EXIT_OK
+    assert len(os.listdir(os.path.join(directory, "Quercus_robur"))) == 4
+    assert os.listdir(os.path.join(directory, "a")) == []
+
+
+def test_missing_directory(tmp_path):
+    assert cli.main(["group", str(tmp_path / "missing")]) == cli.EXIT_NO_INPUT
@@ -0,0 +1,48 @@
+import csv
+import os
+import shutil
+
+import requests
+
+from corpus import generate_corpus
+from dedup import Deduplicator
+from endpoints import PlantNetEndpoints
+from hashing import DigestCache, file_digest
+from utils import identify_images
+
+
+def test_copies_wait_for_their_original(tmp_path, images):
+    copy = str(tmp_path / "copy.jpg")
+    shutil.copyfile(images[0], copy)
+    deduplicator = Deduplicator()
+    assert list(deduplicator.filter([images[0], images[1], copy])) == [images[0], images[1]]
+    assert deduplicator.finish(images[0], "result") == [copy]
+    assert deduplicator.finish(images[1], "other") == []
+    assert deduplicator.leftovers() == []
+
+
+def test_copies_found_after_the_original_finished(tmp_path, images):
+    copy = str(tmp_path / "copy.jpg")
+    shutil.copyfile(images[0], copy)
+    deduplicator = Deduplicator(DigestCache(str(tmp_path / "digests.sqlite3")))
+    assert list(deduplicator.filter([images[0]])) == [images[0]]
+    assert deduplicator.finish(images[0], "result") == []
+    assert list(deduplicator.filter([copy])) == []
+    assert deduplicator.leftovers() == [(copy, "result")]
+    assert deduplicator.leftovers() == []
+
+
+def test_results_are_written_for_every_copy(mock_api, tmp_path):
+    base_url = mock_api()
+    directory = str(tmp_path / "images")
+    paths = generate_corpus(directory, count=20, width=32, height=32, duplicates=0.5, seed=4)
+    distinct = len({file_digest(path) for path in paths})
+    assert distinct < len(paths)
+    output = str(tmp_path / "results.csv")
+    with PlantNetEndpoints("key", base_url=base_url) as pne:
+        identify_images(pne, iter(paths), output, workers=4, dedup=True)
+    assert requests.get(base_url + "_stats").json()["identify"] == distinct
+    with open(output, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert sorted(row["Image File"] for row in rows) == sorted(os.path.basename(path) for path in paths)
+    assert {row["Species Name"] for row in rows} == {"Quercus robur"}
@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from PIL import Image
+
+from corpus import synthetic_exif
+from exif import dms_to_degrees, extract_metadata, read_metadata
+
+
+def write_image(path, exif=None):
+    image = Image.new("RGB", (16, 16), (40, 120, 40))
+    if exif is None:
+        image.save(path, "JPEG")
+    else:
+        image.save(path, "JPEG", exif=exif)
+    return str(path)
+
+
+def test_date_and_position(tmp_path):
+    path = write_image(tmp_path / "a.jpg", synthetic_exif(datetime(2024, 5, 1, 9, 30, 15), 41.0125, -29.5))
+    metadata = read_metadata(path)
+    assert metadata["date"] == "2024:05:01 09:30:15"
+    assert abs(metadata["latitude"] - 41.0125) < 1e-4
+    assert abs(metadata["longitude"] + 29.5) < 1e-4
+    assert metadata["altitude"] == 120.0
+    latitude, longitude = metadata["location"].split(", ")
+    assert abs(dms_to_degrees(latitude) - metadata["latitude"]) < 1e-4
+    assert abs(dms_to_degrees(longitude) - metadata["longitude"]) < 1e-4
+
+
+def test_image_without_exif(tmp_path):
+    path = write_image(tmp_path / "plain.jpg")
+    assert read_metadata(path) == {"date": None, "latitude": None, "longitude": None, "altitude": None,
+                                   "location": None}
+
+
+def test_extract_metadata_keeps_going_after_bad_files(tmp_path):
+    good = write_image(tmp_path / "good.jpg", synthetic_exif(datetime(2024, 5, 1), 10.0, 20.0))
+    bad = tmp_path / "bad.jpg"
+    bad.write_bytes(b"\xff\xd8\xff\xe1\x00\x10Exif\x00\x00MM\x00*\x00\x00\xff\xff")
+    results = extract_metadata([good, str(bad)], workers=1)
+    assert results[good]["date"] == "2024:05:01 00:00:00"
+    assert "error" in results[str(bad)]
@@ -0,0 +1,65 @@
+import csv
+import os
+
+import requests
+
+from endpoints import PlantNetEndpoints
+from journal import Journal
+from utils import identify_images
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))[1:]
+
+
+def test_completed_images_are_skipped(tmp_path, images):
+    path = str(tmp_path / "results.csv.journal")
+    journal = Journal(path)
+    journal.record(images[0], ["row"])
+    journal.close()
+    journal = Journal(path)
+    assert journal.completed(images[0]) == ["row"]
+    assert journal.completed(images[1]) is None
+    journal.close()
+
+
+def test_changed_file_is_identified_again(tmp_path, images):
+    path = str(tmp_path / "results.csv.journal")
+    journal = Journal(path)
+    journal.record(images[0], ["row"])
+    journal.record(images[1], ["row"])
+    # Touching a file keeps its entry as long as the contents are the same.
+    os.utime(images[0], ns=(1, 1))
+    assert journal.completed(images[0]) == ["row"]
+    with open(images[1], "ab") as f:
+        f.write(b"\x00")
+    assert journal.completed(images[1]) is None
+    journal.close()
+
+
+def test_half_written_line_is_ignored(tmp_path, images):
+    path = str(tmp_path / "results.csv.journal")
+    journal = Journal(path)
+    journal.record(images[0], ["row"])
+    journal.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"image": "trunc')
+    journal = Journal(path)
+    journal.record(images[1], ["other"])
+    journal.close()
+    journal = Journal(path)
+    assert journal.completed(images[0]) == ["row"]
+    assert journal.completed(images[1]) == ["other"]
+    journal.close()
+
+
+def test_resumed_run_sends_only_new_images(mock_api, tmp_path, images):
+    base_url = mock_api()
+    output = str(tmp_path / "results.csv")
+    with PlantNetEndpoints("key", base_url=base_url) as pne:
+        identify_images(pne, iter(images[:5]), output, resume=True)
+        identify_images(pne, iter(images), output, resume=True)
+    stats = requests.get(base_url + "_stats").json()
+    assert stats["identify"] == len(images)
+    assert sorted(row[0] for row in read_rows(output)) == sorted(os.path.basename(image) for image in images)
@@ -0,0 +1,60 @@
+import pytest
+
+from keypool import KeyPool, make_client, mask_key, split_keys
+from endpoints import PlantNetEndpoints
+from quota import QuotaExhausted
+
+
+def test_split_keys():
+    assert split_keys(" first, second,,first ") == ["first", "second"]
+    assert split_keys(["a", "b"]) == ["a", "b"]
+    assert mask_key("abcdefghijk") == "abcd..."
+
+
+def test_make_client_reads_the_quota_of_every_key(mock_api):
+    base_url = mock_api(daily_quota=7)
+    with make_client("only", base_url=base_url) as client:
+        assert isinstance(client, PlantNetEndpoints)
+    with make_client("first-key,second-key", base_url=base_url) as client:
+        assert isinstance(client, KeyPool) and len(client) == 2
+        assert [key["remaining"] for key in client.status()["keys"]] == [7, 7]
+
+
+def test_calls_go_to_the_key_with_most_quota_left(mock_api, images):
+    base_url = mock_api(daily_quota=5)
+    with PlantNetEndpoints("first-key", base_url=base_url) as pne:
+        for image in images[:3]:
+            pne.identify_post(images=[image])
+    with make_client("first-key,second-key", base_url=base_url) as pool:
+        pool.identify_post(images=images[:1])
+        pool.identify_post(images=images[1:2])
+        assert [key["completed"] for key in pool.status()["keys"]] == [0, 2]
+
+
+def test_requests_spread_over_keys_until_exhausted(mock_api, images):
+    with KeyPool(["first-key", "second-key"], base_url=mock_api(daily_quota=3)) as pool:
+        pool.refresh()
+        for image in images[:6]:
+            pool.identify_post(images=[image])
+        status = pool.status()
+        assert [key["completed"] for key in status["keys"]] == [3, 3]
+        assert status["remaining"] == 0
+        with pytest.raises(QuotaExhausted):
+            pool.identify_post(images=images[:1])
+        assert pool.exhausted
+
+
+def test_rejected_key_is_skipped(mock_api, images):
+    base_url = mock_api(rejected_keys=["bad-key-1"])
+    with KeyPool(["bad-key-1", "good-key-1"], base_url=base_url) as pool:
+        for image in images[:3]:
+            assert pool.identify_post(images=[image])["bestMatch"] == "Quercus robur"
+        assert pool.rejected == [True, False]
+        assert pool.languages() == ["en", "fr", "tr"]
+
+
+def test_all_keys_rejected(mock_api, images):
+    with KeyPool(["bad-key-1", "bad-key-2"], base_url=mock_api(rejected_keys=["bad-key-1", "bad-key-2"])) as pool:
+        pool.refresh()
+        with pytest.raises(QuotaExhausted):
+            pool.identify_post(images=images[:1])
@@ -0,0 +1,73 @@
+import os
+import random
+
+from merge import NameAllocator, get_unique_filename, merge_images, pattern
+
+
+def touch(directory, *names):
+    os.makedirs(directory, exist_ok=True)
+    for name in names:
+        with open(os.path.join(directory, name), "w") as f:
+            f.write(name)
+
+
+def probe(dest_dir, filename):
+    # Reference behaviour: try numbers one by one against the folder listing.
+    name, ext = os.path.splitext(filename)
+    match = pattern.match(name)
+    if match:
+        base, number, suffix = match.group("base"), int(match.group("number")), match.group("suffix")
+        while os.path.exists(os.path.join(dest_dir, f"{base}_{number}_{suffix}{ext}")):
+            number += 1
+        return f"{base}_{number}_{suffix}{ext}"
+    counter = 1
+    while os.path.exists(os.path.join(dest_dir, f"{name}_{counter}{ext}")):
+        counter += 1
+    return f"{name}_{counter}{ext}"
+
+
+def test_free_numbered_name_is_kept(tmp_path):
+    assert NameAllocator(str(tmp_path)).allocate("Quercus_robur_FK_1_A.jpg") == "Quercus_robur_FK_1_A.jpg"
+
+
+def test_first_free_number_is_used(tmp_path):
+    touch(tmp_path, "Quercus_robur_FK_1_A.jpg", "Quercus_robur_FK_3_A.jpg")
+    allocator = NameAllocator(str(tmp_path))
+    assert allocator.allocate("Quercus_robur_FK_1_A.jpg") == "Quercus_robur_FK_2_A.jpg"
+    assert allocator.allocate("Quercus_robur_FK_1_A.jpg") == "Quercus_robur_FK_4_A.jpg"
+    assert allocator.allocate("Quercus_robur_FK_3_A.jpg") == "Quercus_robur_FK_5_A.jpg"
+
+
+def test_other_names_get_a_counter(tmp_path):
+    touch(tmp_path, "leaf_1.jpg")
+    allocator = NameAllocator(str(tmp_path))
+    assert allocator.allocate("leaf.jpg") == "leaf_2.jpg"
+    assert allocator.allocate("leaf.jpg") == "leaf_3.jpg"
+    assert allocator.allocate("leaf.png") == "leaf_1.png"
+
+
+def test_allocator_matches_probing(tmp_path):
+    rng = random.Random(1)
+    names = [f"Genus_species_FK_{rng.randint(1, 6)}_{rng.choice('AB')}.jpg" for _ in range(60)]
+    names += [f"photo{rng.randint(1, 3)}.jpg" for _ in range(20)]
+    touch(tmp_path, *set(rng.sample(names, 20)))
+    allocator = NameAllocator(str(tmp_path))
+    for filename in names:
+        expected = probe(str(tmp_path), filename)
+        assert allocator.allocate(filename) == expected
+        touch(tmp_path, expected)
+
+
+def test_get_unique_filename(tmp_path):
+    touch(tmp_path, "Abies_alba_FK_2_A.jpg")
+    assert get_unique_filename(str(tmp_path), "Abies_alba_FK_2_A.jpg") == "Abies_alba_FK_3_A.jpg"
+
+
+def test_merge_images_renames_and_skips_duplicates(tmp_path):
+    first, second, dest = tmp_path / "one", tmp_path / "two", str(tmp_path / "merged")
+    touch(first / "Abies alba", "Abies_alba_FK_1_A.jpg")
+    touch(second / "Abies alba", "Abies_alba_FK_1_A.jpg", "leaf.jpg")
+    (second / "Abies alba" / "Abies_alba_FK_1_A.jpg").write_text("another photo")
+    (second / "Abies alba" / "leaf.jpg").write_text("Abies_alba_FK_1_A.jpg")
+    merge_images([str(first), str(second)], dest, workers=2)
+    assert sorted(os.listdir(dest)) == ["Abies_alba_FK_1_A.jpg", "Abies_alba_FK_2_A.jpg"]
@@ -0,0 +1,59 @@
+import io
+import json
+
+from cache import ResponseCache
+from endpoints import PlantNetEndpoints
+from metrics import JsonLogExporter, MetricsCollector, PrometheusFileExporter, endpoint_name
+from retry import RetryPolicy
+
+
+def test_endpoint_names_collapse_path_parameters():
+    base = "https://my-api.plantnet.org/v2/"
+    assert endpoint_name(base, base + "identify/weurope?lang=en") == "identify/{project}"
+    assert endpoint_name(base, base + "projects/weurope/species") == "projects/{project}/species"
+    assert endpoint_name(base, base + "quota/daily") == "quota/daily"
+
+
+def test_calls_are_counted(mock_api, images, tmp_path):
+    metrics = MetricsCollector()
+    stream = io.StringIO()
+    hooks = [metrics, JsonLogExporter(stream)]
+    with PlantNetEndpoints("key", base_url=mock_api(error_rate=0.5, seed=1), hooks=hooks,
+                           retry=RetryPolicy(max_attempts=20, backoff=0.001),
+                           cache=ResponseCache(str(tmp_path / "cache.sqlite3"))) as pne:
+        pne.identify_post(images=images[:1])
+        pne.identify_post(images=images[:1])
+        pne.languages()
+    snapshot = metrics.snapshot()
+    calls = {(call["endpoint"], call["status"]): call["count"] for call in snapshot["calls"]}
+    assert calls == {("identify/{project}", "200"): 1, ("identify/{project}", "cache"): 1, ("languages", "200"): 1}
+    assert snapshot["cache_hits"] == {"identify/{project}": 1}
+    assert snapshot["bytes_sent"]["identify/{project}"] > 0
+    assert snapshot["latency"]["elapsed:identify/{project}"]["count"] == 1
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [record["endpoint"] for record in records] == ["identify/{project}", "identify/{project}", "languages"]
+    assert records[0]["retries"] == snapshot["retries"]["identify/{project}"]
+    assert records[1]["cache_hit"]
+
+
+def test_prometheus_text(tmp_path):
+    metrics = MetricsCollector(buckets=(0.1, 1))
+    metrics({"endpoint": "languages", "method": "GET", "status": 200, "elapsed": 0.05, "wait": 0.04,
+             "download": 0.01, "request_bytes": 0, "response_bytes": 20, "retries": 0, "cache_hit": False,
+             "error": None})
+    metrics({"endpoint": "languages", "method": "GET", "status": None, "elapsed": 2.0, "wait": None,
+             "download": None, "request_bytes": 0, "response_bytes": 0, "retries": 3, "cache_hit": False,
+             "error": "ConnectionError"})
+    path = str(tmp_path / "plantnet.prom")
+    with PrometheusFileExporter(metrics, path, interval=60):
+        pass
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    assert 'plantnet_requests_total{endpoint="languages",method="GET",status="200"} 1' in text
+    assert 'plantnet_requests_total{endpoint="languages",method="GET",status="error"} 1' in text
+    assert 'plantnet_request_errors_total{endpoint="languages",error="ConnectionError"} 1' in text
+    assert 'plantnet_request_retries_total{endpoint="languages"} 3' in text
+    assert 'plantnet_elapsed_seconds_bucket{endpoint="languages",le="0.1"} 1' in text
+    assert 'plantnet_elapsed_seconds_bucket{endpoint="languages",le="+Inf"} 2' in text
+    assert 'plantnet_wait_seconds_count{endpoint="languages"} 1' in text
@@ -0,0 +1,88 @@
+import csv
+import os
+import random
+import threading
+import time
+
+import pytest
+
+from endpoints import PlantNetEndpoints
+from pipeline import Pipeline
+from utils import identify_images
+
+
+def test_all_items_pass_every_stage():
+    pipeline = Pipeline(maxsize=4).add_stage(lambda x: x + 1, workers=3).add_stage(lambda x: x * 2, workers=2)
+    assert sorted(pipeline.run(range(100))) == [(x + 1) * 2 for x in range(100)]
+
+
+def test_empty_source():
+    assert list(Pipeline().add_stage(lambda x: x, workers=4).run([])) == []
+
+
+def test_stage_error_is_raised_after_shutdown():
+    def stage(x):
+        if x == 5:
+            raise ValueError("bad item")
+        return x
+
+    before = threading.active_count()
+    with pytest.raises(ValueError, match="bad item"):
+        list(Pipeline(maxsize=2).add_stage(stage, workers=3).run(range(1000)))
+    assert threading.active_count() == before
+
+
+def test_source_error_is_raised():
+    def source():
+        yield 1
+        raise RuntimeError("source failed")
+
+    with pytest.raises(RuntimeError, match="source failed"):
+        list(Pipeline().add_stage(lambda x: x, workers=2).run(source()))
+
+
+def test_consumer_stopping_early_stops_the_threads():
+    pulled = []
+
+    def source():
+        for i in range(10000):
+            pulled.append(i)
+            yield i
+
+    def slow(x):
+        time.sleep(0.001)
+        return x
+
+    before = threading.active_count()
+    results = Pipeline(maxsize=2).add_stage(slow, workers=2).run(source())
+    for _ in range(3):
+        next(results)
+    results.close()
+    assert threading.active_count() == before
+    assert len(pulled) < 100
+
+
+def test_ordered_run_keeps_input_order():
+    def jittery(x):
+        time.sleep(random.uniform(0, 0.005))
+        return x
+
+    pipeline = Pipeline(maxsize=4).add_stage(jittery, workers=4).add_stage(lambda x: x * 2, workers=3)
+    assert list(pipeline.run(range(200), ordered=True)) == [x * 2 for x in range(200)]
+
+
+def test_ordered_run_stops_early():
+    before = threading.active_count()
+    results = Pipeline(maxsize=2).add_stage(lambda x: x, workers=3).run(range(10000), ordered=True)
+    assert [next(results) for _ in range(5)] == [0, 1, 2, 3, 4]
+    results.close()
+    assert threading.active_count() == before
+
+
+def test_identify_images_writes_rows_in_input_order(mock_api, images, tmp_path):
+    output = str(tmp_path / "results.csv")
+    with PlantNetEndpoints("key", base_url=mock_api(latency=0.01, jitter=0.01, seed=1)) as pne:
+        identify_images(pne, iter(images), output, workers=4)
+    with open(output, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))[1:]
+    assert [row[0] for row in rows] == [os.path.basename(image) for image in images]
@@ -0,0 +1,43 @@
+import io
+
+from PIL import Image
+
+from cache import ResponseCache
+from endpoints import PlantNetEndpoints
+from preprocess import ImagePreprocessor, preprocess_image
+
+
+class CountingPreprocessor(ImagePreprocessor):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = 0
+
+    def __call__(self, path):
+        self.calls += 1
+        return super().__call__(path)
+
+
+def test_images_are_downscaled(tmp_path):
+    path = str(tmp_path / "large.jpg")
+    Image.new("RGB", (400, 300), (10, 90, 10)).save(path, "JPEG")
+    name, data = preprocess_image(path, max_side=100, quality=80)
+    assert name == "large.jpg"
+    assert Image.open(io.BytesIO(data)).size == (100, 75)
+
+
+def test_cache_hits_skip_preprocessing(mock_api, images, tmp_path):
+    base_url = mock_api()
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"))
+    preprocessor = CountingPreprocessor(max_side=32, quality=80)
+    with PlantNetEndpoints("key", base_url=base_url, cache=cache, preprocessor=preprocessor) as pne:
+        pne.identify_post(images=images[:2])
+        assert preprocessor.calls == 2
+        pne.identify_post(images=images[:2])
+        assert pne.last_call_cached
+        assert preprocessor.calls == 2
+    # Other settings upload other bytes, so they get their own entry.
+    other = CountingPreprocessor(max_side=32, quality=60)
+    with PlantNetEndpoints("key", base_url=base_url, cache=cache, preprocessor=other) as pne:
+        pne.identify_post(images=images[:2])
+        assert not pne.last_call_cached
+        assert other.calls == 2
@@ -0,0 +1,95 @@
+import csv
+import time
+
+import pytest
+import requests
+
+from batch import identify_batch
+from cache import ResponseCache
+from endpoints import PlantNetEndpoints
+from keypool import KeyPool
+from quota import QuotaExhausted, QuotaScheduler, retry_after_seconds
+from utils import identify_images
+
+
+def test_refresh_reads_limit_and_usage(mock_api, images):
+    with PlantNetEndpoints("key", base_url=mock_api(daily_quota=10)) as pne:
+        scheduler = QuotaScheduler(pne)
+        assert scheduler.refresh() == 10
+        pne.identify_post(images=images[:1])
+        assert scheduler.refresh() == 9
+
+
+def test_reserve_stops_the_batch(mock_api, images):
+    with PlantNetEndpoints("key", base_url=mock_api(daily_quota=5)) as pne:
+        scheduler = QuotaScheduler(pne, reserve=2)
+        scheduler.refresh()
+        results = list(identify_batch(pne, images, workers=1, scheduler=scheduler))
+    done = [image for image, response, _ in results if response is not None]
+    assert len(done) == 3
+    assert scheduler.exhausted
+    assert all(isinstance(error, QuotaExhausted) for _, response, error in results if response is None)
+
+
+def test_acquire_raises_once_reserve_is_reached():
+    scheduler = QuotaScheduler(None, reserve=1)
+    scheduler.remaining = 2
+    scheduler.acquire()
+    with pytest.raises(QuotaExhausted):
+        scheduler.acquire()
+    scheduler.record({"remainingIdentificationRequests": 5})
+    assert scheduler.remaining == 5
+
+
+def test_throttled_calls_are_retried(mock_api, images):
+    with PlantNetEndpoints("key", base_url=mock_api(throttle_rate=0.5, retry_after=0.01, seed=3)) as pne:
+        scheduler = QuotaScheduler(pne, max_retries=50)
+        results = list(identify_batch(pne, images, workers=2, scheduler=scheduler))
+    assert all(error is None for _, _, error in results)
+    assert scheduler.completed == len(images)
+
+
+def test_backoff_only_for_429():
+    scheduler = QuotaScheduler(None, max_retries=2)
+    response = requests.Response()
+    response.status_code = 429
+    response.headers["Retry-After"] = "0.5"
+    error = requests.HTTPError(response=response)
+    assert retry_after_seconds(response) == 0.5
+    assert scheduler.backoff(error, 0)
+    assert scheduler.paused_until > time.monotonic()
+    assert not scheduler.backoff(error, 2)
+    response.status_code = 500
+    assert not scheduler.backoff(error, 0)
+    assert not scheduler.backoff(ValueError(), 0)
+
+
+def test_cache_hits_take_no_quota(mock_api, images, tmp_path):
+    base_url = mock_api(daily_quota=len(images))
+    output = str(tmp_path / "results.csv")
+    with PlantNetEndpoints("key", base_url=base_url, cache=ResponseCache(str(tmp_path / "cache.sqlite3"))) as pne:
+        identify_images(pne, iter(images), output, workers=2)
+        # The daily quota is used up now, but every image is answered from the cache on a rerun.
+        scheduler = QuotaScheduler(pne)
+        assert scheduler.refresh() == 0
+        identify_images(pne, iter(images), output, workers=2, scheduler=scheduler)
+        assert scheduler.remaining == 0
+        with open(output, newline="", encoding="utf-8") as f:
+            assert len(list(csv.reader(f))) == len(images) + 1
+        # Images not in the cache are still refused.
+        results = list(identify_batch(pne, [images[0], [images[0], images[1]]], workers=1, scheduler=scheduler))
+    assert results[0][2] is None
+    assert isinstance(results[1][2], QuotaExhausted)
+
+
+def test_key_pool_answers_cache_hits_without_quota(mock_api, images, tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"))
+    with KeyPool(["first-key", "second-key"], base_url=mock_api(daily_quota=1), cache=cache) as pool:
+        pool.refresh()
+        first = pool.identify_post(images=images[:1])
+        pool.identify_post(images=images[1:2])
+        assert pool.status()["remaining"] == 0
+        assert pool.identify_post(images=images[:1])["results"] == first["results"]
+        assert pool.last_call_cached
+        with pytest.raises(QuotaExhausted):
+            pool.identify_post(images=images[2:3])
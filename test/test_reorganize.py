@@ -0,0 +1,85 @@
+import csv
+import os
+
+from reorganize import UNDO_JOURNAL, check_plan, execute_plan, plan_group_by_species, plan_rename_to_species, undo_plan
+
+
+def touch(directory, *names):
+    os.makedirs(directory, exist_ok=True)
+    for name in names:
+        with open(os.path.join(directory, name), "w") as f:
+            f.write(name)
+
+
+def write_results(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Image File", "Species Name", "Predicted Organ"])
+        writer.writerows(rows)
+    return str(path)
+
+
+def test_collisions_are_skipped(tmp_path):
+    directory = str(tmp_path)
+    touch(directory, "a.jpg", "b.jpg", "taken.jpg")
+    moves, conflicts = check_plan([
+        (os.path.join(directory, "a.jpg"), os.path.join(directory, "new.jpg")),
+        (os.path.join(directory, "b.jpg"), os.path.join(directory, "new.jpg")),
+        (os.path.join(directory, "b.jpg"), os.path.join(directory, "taken.jpg")),
+        (os.path.join(directory, "gone.jpg"), os.path.join(directory, "other.jpg")),
+        (os.path.join(directory, "taken.jpg"), os.path.join(directory, "taken.jpg")),
+    ])
+    assert moves == [(os.path.join(directory, "a.jpg"), os.path.join(directory, "new.jpg"))]
+    assert [reason for _, _, reason in conflicts] == ["another file is planned to the same name",
+                                                      "destination already exists", "source does not exist"]
+
+
+def test_dry_run_changes_nothing(tmp_path):
+    directory = str(tmp_path)
+    touch(directory, "a.jpg")
+    csv_file = write_results(tmp_path / "results.csv", [["a.jpg", "Quercus robur", "leaf"]])
+    moves, conflicts, failures = execute_plan(plan_rename_to_species(csv_file, directory, "FK"),
+                                              journal_path=os.path.join(directory, UNDO_JOURNAL), dry_run=True)
+    assert moves == [(os.path.join(directory, "a.jpg"), os.path.join(directory, "Quercus_robur_leaf_1_FK.jpg"))]
+    assert sorted(os.listdir(directory)) == ["a.jpg", "results.csv"]
+
+
+def test_threaded_group_and_undo(tmp_path):
+    directory = str(tmp_path)
+    names = [f"Quercus_robur_leaf_{i}_FK.jpg" for i in range(50)] + [f"Pinus_nigra_bark_{i}_FK.jpg" for i in range(50)]
+    touch(directory, *names, "notes.jpg")
+    journal = os.path.join(directory, UNDO_JOURNAL)
+    moves, conflicts, failures = execute_plan(plan_group_by_species(directory), journal_path=journal, workers=8)
+    assert (len(moves), conflicts, failures) == (100, [], [])
+    assert len(os.listdir(os.path.join(directory, "Quercus_robur"))) == 50
+    assert undo_plan(journal) == 100
+    # The species folders created by the run are removed again, and so is the emptied journal.
+    assert sorted(os.listdir(directory)) == sorted(names + ["notes.jpg"])
+
+
+def test_undo_reverts_one_run_at_a_time(tmp_path):
+    directory = str(tmp_path)
+    touch(directory, "a.jpg", "b.jpg")
+    journal = os.path.join(directory, UNDO_JOURNAL)
+    first = write_results(tmp_path / "first.csv", [["a.jpg", "Abies alba", "leaf"], ["b.jpg", "Abies alba", "bark"]])
+    execute_plan(plan_rename_to_species(first, directory, "FK"), journal_path=journal)
+    execute_plan(plan_group_by_species(directory), journal_path=journal)
+    assert os.listdir(os.path.join(directory, "Abies_alba")) != []
+
+    assert undo_plan(journal) == 2
+    assert not os.path.exists(os.path.join(directory, "Abies_alba"))
+    assert os.path.exists(os.path.join(directory, "Abies_alba_leaf_1_FK.jpg"))
+    assert os.path.exists(journal)
+
+    assert undo_plan(journal) == 2
+    assert sorted(os.listdir(directory)) == ["a.jpg", "b.jpg", "first.csv"]
+
+
+def test_folder_with_other_files_is_kept(tmp_path):
+    directory = str(tmp_path)
+    touch(directory, "Abies_alba_leaf_1_FK.jpg")
+    journal = os.path.join(directory, UNDO_JOURNAL)
+    execute_plan(plan_group_by_species(directory), journal_path=journal)
+    touch(os.path.join(directory, "Abies_alba"), "added later.jpg")
+    assert undo_plan(journal) == 1
+    assert os.listdir(os.path.join(directory, "Abies_alba")) == ["added later.jpg"]
@@ -0,0 +1,53 @@
+import sqlite3
+import threading
+
+from endpoints import PlantNetEndpoints
+from hashing import file_digest
+from results import ResultStore
+from utils import identify_images
+
+
+def test_rows_of_an_identify_run(mock_api, tmp_path, images):
+    store = ResultStore(str(tmp_path / "results.sqlite3"))
+    with PlantNetEndpoints("key", base_url=mock_api()) as pne:
+        identify_images(pne, iter(images), str(tmp_path / "results.csv"), workers=4, store=store)
+    assert store.species_counts() == [("Quercus robur", len(images), 0.9)]
+    rows = store.results_for(images[0])
+    assert [row[:2] for row in rows] == [(1, "Quercus robur"), (2, "Pinus nigra"), (3, "Acer campestre"),
+                                         (4, "Abies alba"), (5, "Fagus sylvatica")]
+    assert rows[0][3:] == ("1000", "0-1")
+    assert [row[1] for row in store.find_by_hash(file_digest(images[1]))] == [images[1]]
+    store.close()
+    conn = sqlite3.connect(str(tmp_path / "results.sqlite3"))
+    date, latitude, organ = conn.execute("SELECT date, latitude, predicted_organ FROM images WHERE path = ?",
+                                         (images[0],)).fetchone()
+    assert date.startswith("2024:05:01") and latitude is not None and organ == "leaf"
+    conn.close()
+
+
+def test_errors_are_stored(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite3"))
+    store.add("missing.jpg", error=ValueError("upload failed"))
+    store.commit()
+    assert store.results_for("missing.jpg") == []
+    store.close()
+    conn = sqlite3.connect(str(tmp_path / "results.sqlite3"))
+    assert conn.execute("SELECT file_name, error FROM images").fetchall() == [("missing.jpg", "upload failed")]
+    conn.close()
+
+
+def test_rows_from_worker_threads(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite3"), commit_every=7)
+    response = {"results": [{"score": 0.5, "species": {"scientificNameWithoutAuthor": "Abies alba"}}]}
+
+    def add(worker):
+        for i in range(25):
+            store.add(f"{worker}_{i}.jpg", response=response)
+
+    threads = [threading.Thread(target=add, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.species_counts() == [("Abies alba", 100, 0.5)]
+    store.close()
@@ -0,0 +1,65 @@
+import time
+
+import pytest
+import requests
+
+from endpoints import PlantNetEndpoints
+from retry import CircuitBreaker, CircuitOpen, RetryPolicy
+
+
+def stats(base_url):
+    return requests.get(base_url + "_stats").json()
+
+
+def test_transient_errors_are_retried(mock_api, images):
+    base_url = mock_api(error_rate=0.4, seed=2)
+    with PlantNetEndpoints("key", base_url=base_url, retry=RetryPolicy(max_attempts=20, backoff=0.001)) as pne:
+        for image in images:
+            assert pne.identify_post(images=[image])["bestMatch"] == "Quercus robur"
+    assert stats(base_url)["errors"] > 0
+    assert stats(base_url)["identify"] == len(images) + stats(base_url)["errors"]
+
+
+def test_retries_stop_after_max_attempts(mock_api, images):
+    base_url = mock_api(error_rate=1.0)
+    with PlantNetEndpoints("key", base_url=base_url, retry=RetryPolicy(max_attempts=3, backoff=0.001)) as pne:
+        with pytest.raises(requests.HTTPError) as raised:
+            pne.identify_post(images=images[:1])
+    assert raised.value.response.status_code == 503
+    assert stats(base_url)["identify"] == 3
+
+
+def test_delay_is_capped():
+    policy = RetryPolicy(backoff=1, max_backoff=2)
+    assert all(0 <= policy.delay(attempt) <= 2 for attempt in range(10))
+    assert not RetryPolicy(retry_methods=("GET",)).should_retry("POST", 0)
+
+
+def test_open_circuit_fails_fast_with_max_wait(mock_api, images):
+    base_url = mock_api(error_rate=1.0)
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, max_wait=0.01)
+    with PlantNetEndpoints("key", base_url=base_url, retry=RetryPolicy(max_attempts=1),
+                           circuit_breaker=breaker) as pne:
+        for _ in range(2):
+            with pytest.raises(requests.HTTPError):
+                pne.identify_post(images=images[:1])
+        assert breaker.is_open
+        with pytest.raises(CircuitOpen):
+            pne.identify_post(images=images[:1])
+    assert stats(base_url)["identify"] == 2
+
+
+def test_circuit_closes_when_status_answers(mock_api, images):
+    base_url = mock_api(error_rate=1.0)
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    with PlantNetEndpoints("key", base_url=base_url, retry=RetryPolicy(max_attempts=1),
+                           circuit_breaker=breaker) as pne:
+        with pytest.raises(requests.HTTPError):
+            pne.identify_post(images=images[:1])
+        assert breaker.is_open
+        started = time.monotonic()
+        # _status answers, so the call goes through after the reset timeout (and fails again).
+        with pytest.raises(requests.HTTPError):
+            pne.identify_post(images=images[:1])
+        assert time.monotonic() - started >= 0.05
+        assert stats(base_url)["identify"] == 2